@@ -0,0 +1,49 @@
+"""
+Benchmark the time it takes to import high5py in a fresh interpreter, and check
+that importing it does not also import heavy dependencies (h5py, numpy,
+unittest), which are loaded lazily on first use.
+
+Usage:
+    python import_time.py [num_trials]
+"""
+import os
+import subprocess
+import sys
+import time
+
+
+# Locate high5py package
+curr_dir = os.path.dirname(os.path.abspath(__file__))
+pkg_dir = os.path.abspath(os.path.join(curr_dir, '..'))
+heavy_modules = ['h5py', 'numpy', 'unittest']
+
+
+def time_import(statement):
+    start = time.perf_counter()
+    subprocess.check_call(
+        [sys.executable, '-c', statement], cwd=pkg_dir)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    num_trials = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    # Check that heavy dependencies are not imported
+    loaded = subprocess.check_output(
+        [sys.executable, '-c', (
+            'import sys, high5py; '
+            'print(" ".join(m for m in {} if m in sys.modules))').format(
+                heavy_modules)],
+        cwd=pkg_dir).decode().split()
+    if loaded:
+        sys.exit('Importing high5py also imported: {}'.format(
+            ', '.join(loaded)))
+
+    # Time a bare interpreter, importing high5py, and first use of high5py
+    for label, statement in [
+            ('python', 'pass'),
+            ('import high5py', 'import high5py'),
+            ('high5py.info', 'import high5py; high5py.info')]:
+        times = sorted(time_import(statement) for _ in range(num_trials))
+        print('{:<16} median {:7.1f} ms, min {:7.1f} ms'.format(
+            label, 1e3 * times[len(times) // 2], 1e3 * times[0]))
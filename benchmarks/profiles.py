@@ -0,0 +1,105 @@
+"""
+Benchmark the effect of file tuning profiles on load_dataset and info, for a
+file with many small datasets spread over many groups.  Each file is saved
+with a profile, then read with and without the profile's access settings.
+
+Files are read through a file object that counts read requests and bytes, and
+adds a fixed latency to each request to mimic a parallel or network filesystem,
+where the number of requests dominates.  Use a latency of 0 to time the local
+filesystem alone.
+
+Usage:
+    python profiles.py [output_dir] [num_groups] [num_datasets_per_group]
+        [latency_ms]
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+# Locate high5py package
+curr_dir = os.path.dirname(os.path.abspath(__file__))
+pkg_dir = os.path.abspath(os.path.join(curr_dir, '..'))
+sys.path.insert(0, pkg_dir)
+import high5py
+
+
+class CountingFile(io.FileIO):
+    # Read-only file that counts read requests and bytes, with added latency
+    latency = 0.
+    num_reads = 0
+    num_bytes = 0
+
+    def readinto(self, buffer):
+        CountingFile.num_reads += 1
+        if CountingFile.latency > 0:
+            time.sleep(CountingFile.latency)
+        num_bytes = super().readinto(buffer)
+        CountingFile.num_bytes += num_bytes
+        return num_bytes
+
+
+def time_calls(func, filepath, names, num_repeats=3):
+    # Best of several passes, per call, along with read requests and bytes per
+    # call in the last pass
+    best = float('inf')
+    for _ in range(num_repeats):
+        CountingFile.num_reads = CountingFile.num_bytes = 0
+        start = time.perf_counter()
+        for name in names:
+            with CountingFile(filepath, 'rb') as fileobj:
+                func(fileobj, name)
+        best = min(best, (time.perf_counter() - start) / len(names))
+    return (
+        best, CountingFile.num_reads / len(names),
+        CountingFile.num_bytes / len(names))
+
+
+if __name__ == '__main__':
+    out_dir = sys.argv[1] if len(sys.argv) > 1 else tempfile.mkdtemp()
+    num_groups = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    num_datasets = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    CountingFile.latency = 1e-3 * (
+        float(sys.argv[4]) if len(sys.argv) > 4 else 0.5)
+    rng = np.random.default_rng(0)
+    data = {
+        'group{:03d}/dataset{:03d}'.format(grp, dset): rng.random(
+            rng.integers(10, 1000))
+        for grp in range(num_groups) for dset in range(num_datasets)}
+    names = list(data)
+    sample = [names[idx] for idx in rng.permutation(len(names))[:200]]
+    groups = sorted(set(name.split('/')[0] for name in sample))
+
+    print('Simulated latency: {:.2f} ms per read request'.format(
+        1e3 * CountingFile.latency))
+    print('{:<12} {:<5} {:>9} {:>11} {:>10} {:>10} {:>10}'.format(
+        'profile', 'read', 'size (kB)', 'reads/load', 'kB/load',
+        'load (us)', 'info (us)'))
+    for profile in [None, 'throughput', 'small_reads', 'archive']:
+        filepath = os.path.join(out_dir, 'profile_{}.h5'.format(profile))
+        high5py.save_tree(filepath, {}, profile=profile)
+        for name, val in data.items():
+            high5py.append_dataset(filepath, val, name=name, profile=profile)
+        read_profiles = [None] if profile is None else [None, profile]
+        for read_profile in read_profiles:
+            load_time, num_reads, num_bytes = time_calls(
+                lambda fileobj, name: high5py.load_dataset(
+                    fileobj, name, profile=read_profile), filepath, sample)
+            devnull = open(os.devnull, 'w')
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                info_time, _, _ = time_calls(
+                    lambda fileobj, name: high5py.info(
+                        fileobj, name, profile=read_profile), filepath, groups)
+            finally:
+                sys.stdout = stdout
+                devnull.close()
+            print('{:<12} {:<5} {:>9.0f} {:>11.1f} {:>10.1f} {:>10.0f} '
+                  '{:>10.0f}'.format(
+                      str(profile), 'yes' if read_profile else 'no',
+                      os.path.getsize(filepath) / 1e3, num_reads,
+                      num_bytes / 1e3, 1e6 * load_time, 1e6 * info_time))
@@ -1,7 +1,9 @@
-# Set up top level namespace
+# Set up top level namespace.  Functions are imported lazily (on first access)
+# using a module-level __getattr__, so that "import high5py" does not pay for
+# importing h5py, numpy, or unittest until they are actually needed.
+import importlib as _importlib
+
 from ._version import __version__
-from .high5py import *
-from .testhigh5py import run_all_tests
 
 
 # This must be defined for the Sphinx autodocumentation to work
@@ -15,9 +17,44 @@ __all__ = [
     'rename',
     'append_dataset',
     'replace_dataset',
+    'dedupe_report',
+    'SWMRWriter',
+    'tail_dataset',
+    'concat_virtual',
+    'sync',
+    'dumps',
+    'loads',
     'load_attributes',
     'save_attributes',
     'append_attributes',
+    'save_ragged',
+    'load_ragged',
+    'save_sparse',
+    'load_sparse',
+    'sparse_dot',
+    'save_tree',
+    'load_tree',
     'to_npz',
-    'from_npz'
+    'from_npz',
+    'to_npy_dir',
+    'from_npy_dir',
+    'build_zone_map',
+    'query_dataset'
 ]
+
+
+def __getattr__(name):
+    if name in __all__:
+        module = _importlib.import_module('.high5py', __name__)
+    elif name == 'run_all_tests':
+        module = _importlib.import_module('.testhigh5py', __name__)
+    else:
+        raise AttributeError(
+            'module {!r} has no attribute {!r}'.format(__name__, name))
+    val = getattr(module, name)
+    globals()[name] = val
+    return val
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | {'run_all_tests'})
@@ -1,8 +1,147 @@
+import concurrent.futures as _futures
+import glob as _glob
+import io as _io
+import json as _json
+import os as _os
+import posixpath as _posixpath
+import time as _time
+import zlib as _zlib
+from urllib.parse import quote as _quote
+from urllib.parse import unquote as _unquote
+
 import numpy as _np
 import h5py as _h5py
 
 
-def info(filepath, name='/', return_info=False):
+# Prefix for names of groups used internally by high5py, which are hidden from
+# listings and exports
+_PRIVATE_PREFIX = '_high5py_'
+
+# Group holding the deduplication index.  Each member is a hard link, named by
+# content hash, to a dataset saved with dedupe=True, so the index follows
+# renames automatically and new names can be linked to it directly.
+_DEDUPE_GROUP = '/' + _PRIVATE_PREFIX + 'dedupe'
+
+# Group in a sync destination caching checksums of its chunks
+_SYNC_GROUP = '/' + _PRIVATE_PREFIX + 'sync'
+
+# Group holding zone maps (see build_zone_map), one subgroup per dataset
+_ZONE_MAP_GROUP = '/' + _PRIVATE_PREFIX + 'zone_maps'
+
+
+# File creation ('create') and access ('access') settings for each tuning
+# profile, as keyword arguments to h5py.File.  Paged file-space management
+# groups metadata into pages that the page buffer caches, and alignment places
+# large objects on boundaries suited to parallel filesystems.
+_PROFILES = {
+    'throughput': {
+        'create': {
+            'fs_strategy': 'page', 'fs_persist': True,
+            'fs_page_size': 2**22},
+        'access': {
+            'libver': 'latest', 'page_buf_size': 2**26,
+            'meta_block_size': 2**20, 'alignment_threshold': 2**20,
+            'alignment_interval': 2**22}},
+    'small_reads': {
+        'create': {
+            'fs_strategy': 'page', 'fs_persist': True,
+            'fs_page_size': 2**16},
+        'access': {
+            'libver': 'latest', 'page_buf_size': 2**24,
+            'meta_block_size': 2**16, 'alignment_threshold': 2**16,
+            'alignment_interval': 2**16}},
+    'archive': {
+        'create': {'fs_strategy': 'fsm', 'fs_persist': True},
+        'access': {'libver': 'latest'}}}
+
+
+def _abs_name(name):
+    # Normalize an HDF5 name to an absolute path, for consistent bookkeeping
+    return _posixpath.normpath(_posixpath.join('/', name))
+
+
+def _is_private(name):
+    # True if any part of an HDF5 name is a private high5py group
+    return any(
+        part.startswith(_PRIVATE_PREFIX) for part in name.split('/'))
+
+
+def _write_mode(filepath, overwrite):
+    # File mode for saving.  New files get mode 'w' even when appending, since
+    # h5py only accepts file creation settings in that mode.  h5py does not
+    # truncate file-like objects opened with mode 'w', so in-memory files are
+    # emptied here.
+    if isinstance(filepath, str):
+        return 'a' if not overwrite and _os.path.exists(filepath) else 'w'
+    if not overwrite and filepath.seek(0, _io.SEEK_END) > 0:
+        return 'a'
+    if hasattr(filepath, 'truncate'):
+        filepath.seek(0)
+        filepath.truncate()
+    return 'w'
+
+
+def _access_kwargs(profile):
+    # Keyword arguments to h5py.File for opening a file with the access
+    # settings of a tuning profile, which is all that readers need
+    if profile is None:
+        return {}
+    if profile not in _PROFILES:
+        raise ValueError('Unknown profile {!r}, must be one of {}'.format(
+            profile, sorted(_PROFILES)))
+    return dict(_PROFILES[profile]['access'])
+
+
+def _profile_kwargs(file_mode, profile):
+    # Keyword arguments to h5py.File for a tuning profile.  File-space settings
+    # can only be given when the file is created.
+    kwargs = _access_kwargs(profile)
+    if profile is not None and file_mode == 'w':
+        kwargs.update(_PROFILES[profile]['create'])
+    return kwargs
+
+
+def _dedupe_key(data, description):
+    # Hash the raw buffer along with dtype, shape, and description, since hard
+    # links share attributes too.  Strings and object arrays are not deduped.
+    arr = _np.asarray(data)
+    if arr.dtype.kind in 'OUS':
+        return None
+    header = '{}|{}'.format(arr.dtype.str, arr.shape)
+    if description is not None:
+        header += '|' + description
+    key = _zlib.crc32(_np.ascontiguousarray(arr))
+    key = _zlib.crc32(header.encode(), key)
+    return '{}/{:08x}'.format(_DEDUPE_GROUP, key)
+
+
+def _dedupe_lookup(fid, data, description, key):
+    # Return the index entry for an existing dataset with identical content and
+    # description, if any.  Hash hits are verified, since collisions are
+    # possible and the description may have changed since the dataset was
+    # saved (links share attributes).
+    dset = fid.get(key)
+    if dset is None:
+        return None
+    arr = _np.asarray(data)
+    if (dset.attrs.get('Description') == description and
+            dset.dtype == arr.dtype and dset.shape == arr.shape and
+            _np.array_equal(dset[()], arr)):
+        return key
+    return None
+
+
+def _dedupe_prune(fid):
+    # Drop index entries for datasets no longer linked from anywhere else
+    index = fid.get(_DEDUPE_GROUP)
+    if index is None:
+        return
+    for key in list(index):
+        if _h5py.h5o.get_info(index[key].id).rc <= 1:
+            del index[key]
+
+
+def info(filepath, name='/', return_info=False, profile=None):
     """Print and return information about HDF5 file/group/dataset.
 
     Parameters
@@ -14,6 +153,11 @@ def info(filepath, name='/', return_info=False):
         ('/').
     return_info: bool, optional
         If True, return a dictionary of results.  Defaults to False.
+    profile: str or None, optional
+        File tuning profile ('throughput', 'small_reads', or 'archive') whose
+        access settings (e.g., page buffer size) are used to open the file,
+        best matching the profile the file was saved with.  See save_dataset.
+        Defaults to None, for which h5py defaults are used.
 
     Returns
     -------
@@ -22,12 +166,13 @@ def info(filepath, name='/', return_info=False):
         Only provided if return_info is True.
     """
     name = '{}'.format(name)
-    with _h5py.File(filepath, 'r') as fid:
+    with _h5py.File(filepath, 'r', **_access_kwargs(profile)) as fid:
         info_dict = {'filename': fid.filename, 'name': fid[name].name}
         if isinstance(fid[name], _h5py.Group):
             info_dict['groups'] = [
                 subname for subname in fid[name]
-                if isinstance(fid['{}/{}'.format(name, subname)], _h5py.Group)]
+                if isinstance(fid['{}/{}'.format(name, subname)], _h5py.Group)
+                and not _is_private(subname)]
             info_dict['datasets'] = [
                 subname for subname in fid[name]
                 if isinstance(
@@ -48,7 +193,7 @@ def info(filepath, name='/', return_info=False):
         return info_dict
 
 
-def list_all(filepath, name='/', return_info=False):
+def list_all(filepath, name='/', return_info=False, profile=None):
     """List all groups and datasets in HDF5 file or group.
 
     Parameters
@@ -59,6 +204,11 @@ def list_all(filepath, name='/', return_info=False):
         HDF5 group name (e.g., /group).  Defaults to root group ('/').
     return_into: bool, optional
         If True, return a dictionary of results.  Defaults to False.
+    profile: str or None, optional
+        File tuning profile ('throughput', 'small_reads', or 'archive') whose
+        access settings (e.g., page buffer size) are used to open the file,
+        best matching the profile the file was saved with.  See save_dataset.
+        Defaults to None, for which h5py defaults are used.
 
     Returns
     -------
@@ -68,10 +218,13 @@ def list_all(filepath, name='/', return_info=False):
     """
     all_names = []
     all_items = {}
-    with _h5py.File(filepath, 'r') as fid:
+    with _h5py.File(filepath, 'r', **_access_kwargs(profile)) as fid:
         fid[name].visit(all_names.append)
-        max_len = max([len(name) for name in all_names])
+        all_names = [name for name in all_names if not _is_private(name)]
+        max_len = max([len(name) for name in all_names] + [0])
         def print_item(name, obj):
+            if _is_private(name):
+                return
             all_items[name] = str(obj)
             print(
                 ('{:<' + '{:d}'.format(max_len) + '}    {}').format(name, obj))
@@ -80,7 +233,7 @@ def list_all(filepath, name='/', return_info=False):
         return all_items
 
 
-def exists(filepath, name):
+def exists(filepath, name, profile=None):
     """Determine if group/dataset name exists in HDF5 file.
 
     Parameters
@@ -89,6 +242,11 @@ def exists(filepath, name):
         Path to HDF5 file.
     name: str
         HDF5 group/dataset name (e.g., /group/dataset).
+    profile: str or None, optional
+        File tuning profile ('throughput', 'small_reads', or 'archive') whose
+        access settings (e.g., page buffer size) are used to open the file,
+        best matching the profile the file was saved with.  See save_dataset.
+        Defaults to None, for which h5py defaults are used.
 
     Returns
     -------
@@ -96,12 +254,13 @@ def exists(filepath, name):
         Boolean describing if path exists in HDF5 file.
     """
     avail_names = []
-    with _h5py.File(filepath, 'r') as fid:
+    with _h5py.File(filepath, 'r', **_access_kwargs(profile)) as fid:
         fid.visit(avail_names.append)
     return name in avail_names
 
 
-def load_dataset(filepath, name='data', start_index=None, end_index=None):
+def load_dataset(
+    filepath, name='data', start_index=None, end_index=None, profile=None):
     """Load dataset from HDF5 file.
 
     Parameters
@@ -120,6 +279,11 @@ def load_dataset(filepath, name='data', start_index=None, end_index=None):
         more efficient than returning the entire dataset and then slicing.
         Defaults to None, for which no slicing will be done on the end of the
         dataset.
+    profile: str or None, optional
+        File tuning profile ('throughput', 'small_reads', or 'archive') whose
+        access settings (e.g., page buffer size) are used to open the file,
+        best matching the profile the file was saved with.  See save_dataset.
+        Defaults to None, for which h5py defaults are used.
 
     Returns
     -------
@@ -128,7 +292,7 @@ def load_dataset(filepath, name='data', start_index=None, end_index=None):
         some sort of numpy array), except that single-element arrays will be
         returned as scalars.
     """
-    with _h5py.File(filepath, 'r') as fid:
+    with _h5py.File(filepath, 'r', **_access_kwargs(profile)) as fid:
         if start_index is None and end_index is None:
             data = fid[name][()]
         elif start_index is None and end_index is not None:
@@ -142,7 +306,7 @@ def load_dataset(filepath, name='data', start_index=None, end_index=None):
 
 def save_dataset(
     filepath, data, name='data', description=None, overwrite=True,
-    compression_level=None):
+    compression_level=None, dedupe=False, profile=None):
     """Save dataset to HDF5 file (overwrites file by default).
 
     Parameters
@@ -164,20 +328,40 @@ def save_dataset(
         is available on all h5py installations and offers good compression with
         moderate speed.  Defaults to None, for which no compression/filter is
         applied.
+    dedupe: bool, optional
+        If True, hash the data and, if a dataset with identical content (and
+        description) was previously saved with dedupe=True, create a hard link
+        to it instead of writing the data again.  Linked names share storage
+        and attributes.  Defaults to False.
+    profile: str or None, optional
+        File tuning profile.  'throughput' uses large file-space pages, a large
+        page buffer, and aligned datasets, for large sequential reads/writes.
+        'small_reads' uses small pages, for files with many small datasets or
+        frequent metadata lookups.  'archive' uses the latest (most compact)
+        file format and keeps track of free space, so that space freed by
+        deleting or replacing datasets is reused.  File-space settings only
+        take effect when the file is created.  Defaults to None, for which h5py
+        defaults are used.
     """
-    if overwrite:
-        file_mode = 'w'
-    else:
-        file_mode = 'a'
-    with _h5py.File(filepath, file_mode) as fid:
-        if compression_level is not None:
+    file_mode = _write_mode(filepath, overwrite)
+    with _h5py.File(
+            filepath, file_mode,
+            **_profile_kwargs(file_mode, profile)) as fid:
+        key = _dedupe_key(data, description) if dedupe else None
+        existing = None if key is None else _dedupe_lookup(
+            fid, data, description, key)
+        if existing is not None:
+            fid[name] = fid[existing]
+        elif compression_level is not None:
             fid.create_dataset(
                 name, data=data, compression='gzip',
                 compression_opts=compression_level)
         else:
             fid.create_dataset(name, data=data)
-        if description is not None:
+        if description is not None and existing is None:
             fid[name].attrs['Description'] = description
+        if key is not None and existing is None and key not in fid:
+            fid[key] = fid[name]
 
 
 def delete(filepath, name):
@@ -192,6 +376,9 @@ def delete(filepath, name):
     """
     with _h5py.File(filepath, 'a') as fid:
         del fid[name]
+        _dedupe_prune(fid)
+        for path in _zone_maps_under(fid, name):
+            del fid[_zone_map_name(path)]
 
 
 def rename(filepath, old_name, new_name, new_description=None):
@@ -215,10 +402,16 @@ def rename(filepath, old_name, new_name, new_description=None):
         if new_description is not None:
             fid[new_name].attrs['Description'] = new_description
         del fid[old_name]
+        old_name, new_name = _abs_name(old_name), _abs_name(new_name)
+        for path in _zone_maps_under(fid, old_name):
+            fid.move(
+                _zone_map_name(path),
+                _zone_map_name(new_name + path[len(old_name):]))
 
 
 def append_dataset(
-    filepath, data, name='data', description=None, compression_level=None):
+    filepath, data, name='data', description=None, compression_level=None,
+    dedupe=False, profile=None):
     """Append dataset to HDF5 file (never overwrites file).
 
     Parameters
@@ -237,14 +430,22 @@ def append_dataset(
         is available on all h5py installations and offers good compression with
         moderate speed.  Defaults to None, for which no compression/filter is
         applied.
+    dedupe: bool, optional
+        If True, create a hard link to an existing dataset with identical
+        content instead of writing the data again.  See save_dataset.  Defaults
+        to False.
+    profile: str or None, optional
+        File tuning profile ('throughput', 'small_reads', or 'archive').  See
+        save_dataset.  Defaults to None, for which h5py defaults are used.
     """
     save_dataset(
         filepath, data, name=name, description=description, overwrite=False,
-        compression_level=compression_level)
+        compression_level=compression_level, dedupe=dedupe, profile=profile)
 
 
 def replace_dataset(
-    filepath, data, name='data', description=None, compression_level=None):
+    filepath, data, name='data', description=None, compression_level=None,
+    dedupe=False, profile=None):
     """Replace/overwrite a dataset in an HDF5 file (do not overwrite the whole
     file).
 
@@ -264,14 +465,681 @@ def replace_dataset(
         is available on all h5py installations and offers good compression with
         moderate speed.  Defaults to None, for which no compression/filter is
         applied.
+    dedupe: bool, optional
+        If True, create a hard link to an existing dataset with identical
+        content instead of writing the data again.  See save_dataset.  Defaults
+        to False.
+    profile: str or None, optional
+        File tuning profile ('throughput', 'small_reads', or 'archive').  See
+        save_dataset.  Defaults to None, for which h5py defaults are used.
+
+    A zone map of the dataset (see build_zone_map) is rebuilt for the new
+    data, or dropped if the new data cannot have one.
     """
+    # Keep the zone map only if the new data can be indexed, since delete
+    # drops it along with the old data
+    with _h5py.File(filepath, 'r') as fid:
+        zone_map = _get_zone_map(fid, name)
+        if zone_map is not None:
+            zone_map = dict(zone_map.attrs)
+    if zone_map is not None and not _can_zone_map(_np.asarray(data)):
+        zone_map = None
     delete(filepath, name)
     append_dataset(
         filepath, data, name=name, description=description,
-        compression_level=compression_level)
+        compression_level=compression_level, dedupe=dedupe, profile=profile)
+    if zone_map is not None:
+        build_zone_map(
+            filepath, name=name, axis=zone_map['axis'],
+            zone_size=zone_map['zone_size'], profile=profile)
+
+
+def dedupe_report(filepath, return_info=False):
+    """Print and return a summary of storage saved by deduplication (see the
+    dedupe option of save_dataset).
+
+    Parameters
+    ----------
+    filepath: str
+        Path to HDF5 file.
+    return_info: bool, optional
+        If True, return a dictionary of results.  Defaults to False.
+
+    Returns
+    -------
+    info: dict, optional
+        Dictionary with the number of unique deduplicated datasets, the number
+        of names linked to them, and the bytes saved (both on disk and
+        uncompressed).  Only provided if return_info is True.
+    """
+    info_dict = {
+        'unique_datasets': 0, 'linked_names': 0, 'bytes_saved': 0,
+        'uncompressed_bytes_saved': 0}
+    with _h5py.File(filepath, 'r') as fid:
+        for dset in fid.get(_DEDUPE_GROUP, {}).values():
+            # Count links other than the index entry itself
+            num_names = _h5py.h5o.get_info(dset.id).rc - 1
+            if num_names == 0:
+                continue
+            info_dict['unique_datasets'] += 1
+            info_dict['linked_names'] += num_names
+            info_dict['bytes_saved'] += (
+                (num_names - 1) * dset.id.get_storage_size())
+            info_dict['uncompressed_bytes_saved'] += (
+                (num_names - 1) * dset.size * dset.dtype.itemsize)
+    for key, val in info_dict.items():
+        print((
+            '{:>' + '{:d}'.format(max([len(key) for key in info_dict.keys()]))
+            + '}: {}').format(key, val))
+    if return_info:
+        return info_dict
+
+
+class SWMRWriter(object):
+    """Append rows to a dataset in single-writer/multiple-reader (SWMR) mode,
+    so that other processes can read the file (e.g., using tail_dataset) while
+    it is being written.  Use as a context manager, or call close when done.
+
+    Parameters
+    ----------
+    filepath: str
+        Path to HDF5 file.  The file is created if it does not exist, and is
+        otherwise opened for appending.  SWMR requires the latest HDF5 file
+        format, so an existing file must have been created by SWMRWriter or by
+        a high5py writer with a profile (e.g., profile='archive').
+    name: str, optional
+        HDF5 dataset name (e.g., /group/dataset).  Defaults to 'data'.  If the
+        dataset does not exist, it is created with zero rows and an unlimited
+        first dimension.  An existing dataset must be chunked and have an
+        unlimited first dimension.  If it has a zone map (see build_zone_map)
+        along its first axis, the zone map is kept up to date.  A zone map
+        along its second axis is dropped, since appended rows change its
+        shape.
+    row_shape: tuple, optional
+        Shape of each row (all dimensions after the first).  Only used when
+        creating the dataset.  Defaults to (), for a 1D dataset.
+    dtype: data-type, optional
+        Data type of the dataset.  Only used when creating the dataset.
+        Defaults to float.
+    chunk_rows: int, optional
+        Number of rows per chunk.  Only used when creating the dataset.
+        Defaults to 1024.
+    compression_level: int or None, optional
+        Integer from 0 to 9 specifying compression level for gzip filter.  Only
+        used when creating the dataset.  Defaults to None, for which no
+        compression/filter is applied.
+    flush_interval: float, optional
+        Minimum time in seconds between flushes, which make appended rows
+        visible to readers.  Defaults to 0, for which every append is flushed.
+    profile: str or None, optional
+        File tuning profile ('throughput', 'small_reads', or 'archive').  See
+        save_dataset.  Defaults to None, for which h5py defaults are used.
+    """
+    def __init__(
+        self, filepath, name='data', row_shape=(), dtype=float,
+        chunk_rows=1024, compression_level=None, flush_interval=0.,
+        profile=None):
+        self.flush_interval = flush_interval
+        file_mode = _write_mode(filepath, False)
+        kwargs = {'libver': 'latest'}
+        kwargs.update(_profile_kwargs(file_mode, profile))
+        self._fid = _h5py.File(filepath, file_mode, **kwargs)
+        try:
+            if self._fid.id.get_create_plist().get_version()[0] < 3:
+                raise ValueError(
+                    '{} does not use the latest HDF5 file format, which SWMR '
+                    'requires.  Create it with SWMRWriter, or with a profile '
+                    '(e.g., save_dataset(..., profile=\'archive\')).'.format(
+                        self._fid.filename))
+            if name not in self._fid:
+                kwargs = {}
+                if compression_level is not None:
+                    kwargs = {
+                        'compression': 'gzip',
+                        'compression_opts': compression_level}
+                self._fid.create_dataset(
+                    name, shape=(0,) + tuple(row_shape), dtype=dtype,
+                    maxshape=(None,) + tuple(row_shape),
+                    chunks=(chunk_rows,) + tuple(row_shape), **kwargs)
+            self._dset = self._fid[name]
+            self._zone_map = _get_zone_map(self._fid, name)
+            if (self._zone_map is not None and
+                    int(self._zone_map.attrs['axis']) != 0):
+                del self._fid[_zone_map_name(name)]
+                self._zone_map = None
+            self._fid.swmr_mode = True
+        except Exception:
+            self._fid.close()
+            raise
+        self._last_flush = _time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def append(self, rows):
+        """Append rows to the end of the dataset, flushing if the flush
+        interval has elapsed.
+
+        Parameters
+        ----------
+        rows: array-like
+            Rows to append, with shape (num_rows,) + row_shape.
+        """
+        rows = _np.asarray(rows, dtype=self._dset.dtype)
+        num_old = self._dset.shape[0]
+        self._dset.resize(num_old + rows.shape[0], axis=0)
+        self._dset[num_old:] = rows
+        if self._zone_map is not None:
+            _update_zone_map(self._dset, self._zone_map, num_old)
+        if _time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Flush appended rows so that they are visible to readers."""
+        self._dset.flush()
+        if self._zone_map is not None:
+            for key in ('min', 'max', 'num_rows'):
+                self._zone_map[key].flush()
+        self._last_flush = _time.monotonic()
+
+    def close(self):
+        """Flush and close the file."""
+        if self._fid.id.valid:
+            self.flush()
+            self._fid.close()
+
+
+def tail_dataset(
+    filepath, name='data', start_index=0, poll_interval=0.1, timeout=None):
+    """Generator that follows a dataset being appended in SWMR mode (e.g., by
+    SWMRWriter), yielding only newly appended rows.
+
+    Parameters
+    ----------
+    filepath: str
+        Path to HDF5 file.
+    name: str, optional
+        HDF5 dataset name (e.g., /group/dataset).  Defaults to 'data'.
+    start_index: int, optional
+        Index of the first row to yield.  Defaults to 0, for which existing
+        rows are yielded first.  Use None to yield only rows appended after
+        the file is opened.
+    poll_interval: float, optional
+        Time in seconds to wait between checks for new rows.  Defaults to 0.1.
+    timeout: float or None, optional
+        Stop after this many seconds without new rows.  Defaults to None, for
+        which the generator never stops on its own.
+
+    Yields
+    ------
+    rows: array-like
+        Array of rows appended since the previous yield.
+    """
+    with _h5py.File(filepath, 'r', libver='latest', swmr=True) as fid:
+        dset = fid[name]
+        position = dset.shape[0] if start_index is None else start_index
+        last_data = _time.monotonic()
+        while True:
+            dset.refresh()
+            num_rows = dset.shape[0]
+            if num_rows > position:
+                rows = dset[position:num_rows]
+                position = num_rows
+                last_data = _time.monotonic()
+                yield rows
+            elif (timeout is not None and
+                    _time.monotonic() - last_data >= timeout):
+                return
+            else:
+                _time.sleep(poll_interval)
+
+
+def concat_virtual(
+    out_filepath, filepaths, name='data', axis=0, fill_value=None,
+    out_name=None, overwrite=True, profile=None):
+    """Concatenate a dataset stored in many HDF5 files into a single virtual
+    dataset, without copying any data.  Reading a slice of the virtual dataset
+    (e.g., with load_dataset) only reads from the source files that overlap the
+    slice.
+
+    Parameters
+    ----------
+    out_filepath: str
+        Path to HDF5 file in which to save the virtual dataset.
+    filepaths: str or list of str
+        Paths to source HDF5 files.  A single string is treated as a glob
+        pattern, and matching paths are used in sorted order.  Paths are stored
+        relative to the directory of out_filepath (HDF5 resolves them from
+        there), so the virtual dataset can be read from any working directory
+        as long as the files keep their relative locations.
+    name: str, optional
+        HDF5 dataset name (e.g., /group/dataset) in each source file.  Defaults
+        to 'data'.
+    axis: int, optional
+        Axis along which the datasets are concatenated.  Defaults to 0.
+    fill_value: scalar or None, optional
+        Value used in place of data from missing source files, which are then
+        assumed to have the same shape as the first existing source.  Defaults
+        to None, for which a missing source file raises an error.
+    out_name: str, optional
+        HDF5 dataset name in the output file.  Defaults to None, for which name
+        is used.
+    overwrite: bool
+        If True, saving overwrites the output file.  Otherwise, the virtual
+        dataset is appended to the file.  Defaults to True.
+    profile: str or None, optional
+        File tuning profile ('throughput', 'small_reads', or 'archive').  See
+        save_dataset.  Defaults to None, for which h5py defaults are used.
+    """
+    if isinstance(filepaths, str):
+        filepaths = sorted(_glob.glob(filepaths))
+    if out_name is None:
+        out_name = name
+
+    # Collect and validate source dtypes and shapes
+    sources = []
+    dtype = None
+    shape = None
+    for filepath in filepaths:
+        if not _os.path.exists(filepath):
+            if fill_value is None:
+                raise IOError('Source file {} does not exist'.format(filepath))
+            sources.append((filepath, None))
+            continue
+        with _h5py.File(filepath, 'r') as fid:
+            src_shape = fid[name].shape
+            src_dtype = fid[name].dtype
+        if len(src_shape) == 0:
+            raise ValueError(
+                'Dataset in {} is a scalar and cannot be concatenated'.format(
+                    filepath))
+        if dtype is None:
+            dtype = src_dtype
+            shape = src_shape
+            axis = axis % len(shape)
+        elif src_dtype != dtype:
+            raise ValueError('Dataset in {} has dtype {}, expected {}'.format(
+                filepath, src_dtype, dtype))
+        elif (len(src_shape) != len(shape) or
+                src_shape[:axis] + src_shape[axis + 1:] !=
+                shape[:axis] + shape[axis + 1:]):
+            raise ValueError('Dataset in {} has incompatible shape {}'.format(
+                filepath, src_shape))
+        sources.append((filepath, src_shape))
+    if dtype is None:
+        raise IOError('No source files found')
+
+    # Map each source into its slot along the concatenation axis
+    lengths = [shape[axis] if src_shape is None else src_shape[axis]
+        for _, src_shape in sources]
+    layout = _h5py.VirtualLayout(
+        shape=shape[:axis] + (sum(lengths),) + shape[axis + 1:], dtype=dtype)
+    if isinstance(out_filepath, str):
+        out_dir = _os.path.dirname(_os.path.abspath(out_filepath))
+    else:
+        out_dir = None
+    offset = 0
+    for (filepath, src_shape), length in zip(sources, lengths):
+        if src_shape is not None:
+            filepath = _os.path.abspath(filepath)
+            if out_dir is not None:
+                try:
+                    filepath = _os.path.relpath(filepath, out_dir)
+                except ValueError:
+                    # Different drives on Windows, so keep the absolute path
+                    pass
+            index = ((slice(None),) * axis + (slice(offset, offset + length),))
+            layout[index] = _h5py.VirtualSource(
+                filepath, name, shape=src_shape)
+        offset += length
+
+    # Save virtual dataset
+    file_mode = _write_mode(out_filepath, overwrite)
+    kwargs = {'libver': 'latest'}
+    kwargs.update(_profile_kwargs(file_mode, profile))
+    with _h5py.File(out_filepath, file_mode, **kwargs) as fid:
+        fid.create_virtual_dataset(out_name, layout, fillvalue=fill_value)
 
 
-def load_attributes(filepath, name='data'):
+def _attrs_equal(attrs0, attrs1):
+    # Compare attribute sets, allowing for array-valued attributes
+    if sorted(attrs0.keys()) != sorted(attrs1.keys()):
+        return False
+    for key, val in attrs0.items():
+        other = attrs1[key]
+        if (_np.shape(val) != _np.shape(other) or
+                not _np.array_equal(val, other)):
+            return False
+    return True
+
+
+def _sync_cache_name(path):
+    # Name of the dataset caching chunk checksums for a destination dataset,
+    # with the path quoted so that all caches sit directly in one group
+    return '{}/{}'.format(_SYNC_GROUP, _quote(path, safe=''))
+
+
+def _drop_sync_cache(dst_fid, path):
+    # Drop cached checksums for a path and anything below it
+    cache = dst_fid.get(_SYNC_GROUP)
+    if cache is None:
+        return
+    prefix = _quote(path.rstrip('/') + '/', safe='')
+    for key in list(cache):
+        if key == _quote(path, safe='') or key.startswith(prefix):
+            del cache[key]
+
+
+def _changed_chunks(src_dset, dst_dset, cached):
+    # Return offsets of raw (still compressed) chunks that differ, along with
+    # checksums of all source chunks, or (None, None) if the chunk layouts
+    # differ and the whole dataset must be copied.  Source chunks are compared
+    # to cached checksums of the destination chunks if available, so that the
+    # destination is only read on a cache miss.
+    src_id, dst_id = src_dset.id, dst_dset.id
+    num_chunks = src_id.get_num_chunks()
+    if dst_id.get_num_chunks() != num_chunks:
+        return None, None
+    offsets = [
+        src_id.get_chunk_info(idx).chunk_offset for idx in range(num_chunks)]
+    if cached is not None:
+        cached = {tuple(row[:-1]): row[-1] for row in cached.tolist()}
+        if set(cached) != set(offsets):
+            cached = None
+    if cached is None:
+        dst_offsets = set(
+            dst_id.get_chunk_info(idx).chunk_offset
+            for idx in range(num_chunks))
+        if dst_offsets != set(offsets):
+            return None, None
+    changed = []
+    checksums = []
+    for offset in offsets:
+        src_mask, src_bytes = src_id.read_direct_chunk(offset)
+        checksum = _zlib.crc32(src_bytes, src_mask)
+        checksums.append(offset + (checksum,))
+        if cached is not None:
+            if cached[offset] != checksum:
+                changed.append(offset)
+        else:
+            dst_mask, dst_bytes = dst_id.read_direct_chunk(offset)
+            if src_mask != dst_mask or src_bytes != dst_bytes:
+                changed.append(offset)
+    return changed, _np.array(checksums, dtype=_np.int64)
+
+
+def _block_slices(dset, max_block_bytes=2**26):
+    # Selections covering a dataset in blocks of bounded size along the first
+    # axis (or the whole dataset, if scalar or empty)
+    if dset.ndim == 0 or dset.size == 0:
+        return [()]
+    step = _block_rows(dset.shape, dset.dtype.itemsize, max_block_bytes)
+    return [
+        _np.s_[start:start + step] for start in range(0, dset.shape[0], step)]
+
+
+def _dataset_checksum(dset):
+    # CRC32 of the values of a dataset, read one block at a time.  Variable
+    # length items (e.g., strings) are hashed one at a time, with their
+    # lengths, so that different splits of the same bytes differ.
+    checksum = 0
+    for sel in _block_slices(dset):
+        block = _np.asarray(dset[sel])
+        if block.dtype.kind != 'O':
+            checksum = _zlib.crc32(_np.ascontiguousarray(block), checksum)
+            continue
+        for item in block.ravel():
+            raw = item if isinstance(item, bytes) else _np.asarray(
+                item).tobytes()
+            checksum = _zlib.crc32(
+                len(raw).to_bytes(8, 'little') + raw, checksum)
+    return checksum
+
+
+def _sync_copy(src_fid, dst_fid, src_obj, path, copied):
+    # Copy an object, hard linking objects already copied in this sync, so
+    # that names sharing an object in the source (e.g., from dedupe) still
+    # share it in the destination
+    _drop_sync_cache(dst_fid, path)
+    if src_obj.id in copied:
+        dst_fid[path] = dst_fid[copied[src_obj.id]]
+        return
+    src_fid.copy(src_obj, dst_fid, name=path)
+    copied[src_obj.id] = path
+    if isinstance(src_obj, _h5py.Group):
+        def record(subname, obj):
+            copied.setdefault(obj.id, _posixpath.join(path, subname))
+        src_obj.visititems(record)
+
+
+def _sync_object(src_fid, dst_fid, path, actions, dry_run, verify, copied):
+    # Recursively bring dst_fid[path] up to date with src_fid[path]
+    src_obj = src_fid[path]
+    dst_obj = dst_fid.get(path)
+    is_group = isinstance(src_obj, _h5py.Group)
+    if dst_obj is None or is_group != isinstance(dst_obj, _h5py.Group) or (
+            not is_group and (
+                src_obj.id.get_create_plist() !=
+                dst_obj.id.get_create_plist() or
+                src_obj.shape != dst_obj.shape or
+                src_obj.dtype != dst_obj.dtype)):
+        actions.append(('copy', path))
+        if not dry_run:
+            if dst_obj is not None:
+                del dst_fid[path]
+            _sync_copy(src_fid, dst_fid, src_obj, path, copied)
+        return
+    copied.setdefault(src_obj.id, path)
+
+    # Update attributes in place
+    if not _attrs_equal(src_obj.attrs, dst_obj.attrs):
+        actions.append(('attributes', path))
+        if not dry_run:
+            dst_obj.attrs.clear()
+            for key, val in src_obj.attrs.items():
+                dst_obj.attrs[key] = val
+
+    # Recurse into groups, deleting objects no longer in the source.  The
+    # checksum cache belongs to the destination and is neither copied nor
+    # deleted.
+    if is_group:
+        for subname in dst_obj:
+            subpath = _posixpath.join(path, subname)
+            if subname not in src_obj and subpath != _SYNC_GROUP:
+                actions.append(('delete', subpath))
+                if not dry_run:
+                    del dst_obj[subname]
+                    _drop_sync_cache(dst_fid, subpath)
+        for subname in src_obj:
+            subpath = _posixpath.join(path, subname)
+            if subpath != _SYNC_GROUP:
+                _sync_object(
+                    src_fid, dst_fid, subpath, actions, dry_run, verify,
+                    copied)
+
+    # Copy only changed raw chunks of chunked datasets, falling back to a full
+    # rewrite for contiguous datasets
+    elif src_obj.chunks is not None:
+        cache_name = _sync_cache_name(path)
+        cached = None
+        if not verify and cache_name in dst_fid:
+            cached = dst_fid[cache_name][()]
+        changed, checksums = _changed_chunks(src_obj, dst_obj, cached)
+        if changed is None:
+            actions.append(('copy', path))
+            if not dry_run:
+                del dst_fid[path]
+                _sync_copy(src_fid, dst_fid, src_obj, path, copied)
+            return
+        if len(changed) > 0:
+            actions.append(('chunks', path, len(changed)))
+            if not dry_run:
+                for offset in changed:
+                    filter_mask, raw = src_obj.id.read_direct_chunk(offset)
+                    dst_obj.id.write_direct_chunk(
+                        offset, raw, filter_mask=filter_mask)
+        if not dry_run and (cached is None or len(changed) > 0):
+            if cache_name in dst_fid:
+                del dst_fid[cache_name]
+            dst_fid.create_dataset(cache_name, data=checksums)
+    # Compare contiguous datasets by checksum, against the checksum cached by
+    # the last sync if available, and otherwise block by block
+    else:
+        cache_name = _sync_cache_name(path)
+        cached = None
+        if not verify and cache_name in dst_fid:
+            cached = int(dst_fid[cache_name][()])
+        checksum = _dataset_checksum(src_obj)
+        if cached is None:
+            changed = not all(
+                _np.array_equal(src_obj[sel], dst_obj[sel])
+                for sel in _block_slices(src_obj))
+        else:
+            changed = checksum != cached
+        if changed:
+            actions.append(('data', path))
+            if not dry_run:
+                for sel in _block_slices(src_obj):
+                    dst_obj[sel] = src_obj[sel]
+        if not dry_run and cached != checksum:
+            if cache_name in dst_fid:
+                del dst_fid[cache_name]
+            dst_fid.create_dataset(cache_name, data=checksum, dtype=_np.int64)
+
+
+def sync(src_filepath, dst_filepath, name='/', dry_run=False, verify=False,
+    return_info=False, profile=None):
+    """Make an HDF5 group/dataset in one file identical to that in another
+    file, transferring only what differs.  Objects missing in the destination
+    (or whose shape, type, or storage options differ) are copied, chunked
+    datasets are updated by copying only changed chunks (without decompressing
+    and recompressing them), attributes are updated as needed, and objects no
+    longer in the source are deleted.  Each action taken is printed.
+
+    Checksums of each synced dataset (of each chunk, for chunked datasets) are
+    cached in the destination file, so later syncs read only the source file,
+    unless the cache is missing (e.g., the first sync after a dataset is
+    copied), in which case data are compared directly.  Data are read in
+    blocks of bounded size.  Names that share a dataset
+    through hard links in the source also share it in the destination.
+
+    Parameters
+    ----------
+    src_filepath: str
+        Path to source HDF5 file.
+    dst_filepath: str
+        Path to destination HDF5 file.  The file is created if it does not
+        exist.
+    name: str, optional
+        HDF5 group/dataset name (e.g., /group/dataset).  Defaults to root group
+        ('/').
+    dry_run: bool, optional
+        If True, print and return the actions that would be taken, without
+        modifying the destination file.  Defaults to False.
+    verify: bool, optional
+        If True, ignore cached checksums and compare data directly (chunks
+        byte for byte), which also detects changes made to the destination
+        file by means other than sync.  Defaults to False.
+    return_info: bool, optional
+        If True, return a list of actions.  Defaults to False.
+    profile: str or None, optional
+        File tuning profile ('throughput', 'small_reads', or 'archive') for the
+        destination file.  See save_dataset.  Defaults to None, for which h5py
+        defaults are used.
+
+    Returns
+    -------
+    actions: list, optional
+        List of tuples (action, name) or, for chunk updates, (action, name,
+        number of chunks), where action is one of 'copy', 'attributes',
+        'chunks', 'data', or 'delete'.  Only provided if return_info is True.
+    """
+    name = _abs_name(name)
+    actions = []
+    if (dry_run and isinstance(dst_filepath, str) and
+            not _os.path.exists(dst_filepath)):
+        # Stand in for the missing destination with an empty in-memory file
+        dst_kwargs = {'mode': 'w', 'driver': 'core', 'backing_store': False}
+    elif dry_run:
+        dst_kwargs = {'mode': 'r'}
+        dst_kwargs.update(_access_kwargs(profile))
+    else:
+        dst_kwargs = {'mode': _write_mode(dst_filepath, False)}
+        dst_kwargs.update(_profile_kwargs(dst_kwargs['mode'], profile))
+    with _h5py.File(src_filepath, 'r') as src_fid, \
+            _h5py.File(dst_filepath, **dst_kwargs) as dst_fid:
+        _sync_object(src_fid, dst_fid, name, actions, dry_run, verify, {})
+    for action in actions:
+        print(('{:<10} {}' + ' ({:d} chunks)' * (len(action) - 2)).format(
+            *action))
+    if return_info:
+        return actions
+
+
+def dumps(
+    data, name=None, description=None, compression_level=None, profile=None):
+    """Save data to an in-memory HDF5 file and return its contents as bytes,
+    without any disk I/O.  Use loads to read the bytes back.
+
+    Parameters
+    ----------
+    data: array-like, scalar, str, or dict
+        Data to save.  A dict is saved as a tree (see save_tree).
+    name: str, optional
+        HDF5 dataset name (e.g., /group/dataset), or group name for a dict.
+        Defaults to None, for which 'data' is used for a dataset and the root
+        group ('/') for a dict.
+    description: str, optional
+        String describing dataset.  Description is saved as an HDF5 attribute of
+        the dataset.  Defaults to None, for which no description is saved.
+        Ignored for a dict.
+    compression_level: int or None, optional
+        Integer from 0 to 9 specifying compression level for gzip filter.
+        Defaults to None, for which no compression/filter is applied.
+    profile: str or None, optional
+        File tuning profile ('throughput', 'small_reads', or 'archive').  See
+        save_dataset.  Defaults to None, for which h5py defaults are used.
+
+    Returns
+    -------
+    buffer: bytes
+        Contents of the HDF5 file.
+    """
+    fileobj = _io.BytesIO()
+    if isinstance(data, dict):
+        save_tree(
+            fileobj, data, name='/' if name is None else name,
+            compression_level=compression_level, profile=profile)
+    else:
+        save_dataset(
+            fileobj, data, name='data' if name is None else name,
+            description=description,
+            compression_level=compression_level, profile=profile)
+    return fileobj.getvalue()
+
+
+def loads(buffer):
+    """Wrap the contents of an HDF5 file (e.g., from dumps) in an in-memory
+    file object, which can be passed in place of a file path to any high5py
+    function, e.g., load_dataset(loads(buffer), name='data').
+
+    Parameters
+    ----------
+    buffer: bytes
+        Contents of an HDF5 file.
+
+    Returns
+    -------
+    fileobj: io.BytesIO
+        In-memory HDF5 file.
+    """
+    return _io.BytesIO(buffer)
+
+
+def load_attributes(filepath, name='data', profile=None):
     """Load HDF5 group/dataset attributes from HDF5 file.
 
     Parameters
@@ -280,13 +1148,18 @@ def load_attributes(filepath, name='data'):
         Path to HDF5 file.
     name: str, optional
         HDF5 dataset name (e.g., /group/dataset).  Defaults to 'data'.
+    profile: str or None, optional
+        File tuning profile ('throughput', 'small_reads', or 'archive') whose
+        access settings (e.g., page buffer size) are used to open the file,
+        best matching the profile the file was saved with.  See save_dataset.
+        Defaults to None, for which h5py defaults are used.
 
     Returns
     -------
     attributes: dict
         Dictionary of loaded attributes.
     """
-    with _h5py.File(filepath, 'r') as fid:
+    with _h5py.File(filepath, 'r', **_access_kwargs(profile)) as fid:
         return dict(fid[name].attrs)
 
 
@@ -330,6 +1203,487 @@ def append_attributes(filepath, attributes, name='data'):
     save_attributes(filepath, attributes, name=name, overwrite=False)
 
 
+def save_ragged(
+    filepath, data, name='data', description=None, overwrite=True,
+    compression_level=None, profile=None):
+    """Save a list of variable-length arrays or strings to an HDF5 file, as a
+    group containing a single flat (chunked) dataset of concatenated values and
+    a dataset of offsets into it.  This is faster to write and read, and
+    compresses better, than HDF5 variable-length types.
+
+    Parameters
+    ----------
+    filepath: str
+        Path to HDF5 file.
+    data: list of array-like or list of str
+        Elements to save.  Arrays may differ in length along the first axis,
+        but must share the same type and trailing dimensions.
+    name: str, optional
+        HDF5 group name (e.g., /group/ragged).  Defaults to 'data'.
+    description: str, optional
+        String describing data.  Description is saved as an HDF5 attribute of
+        the group.  Defaults to None, for which no description is saved.
+    overwrite: bool
+        If True, saving overwrites the file.  Otherwise, data is appended to the
+        file.  Defaults to True.
+    compression_level: int or None, optional
+        Integer from 0 to 9 specifying compression level for gzip filter, which
+        is applied to the values.  Defaults to None, for which no
+        compression/filter is applied.
+    profile: str or None, optional
+        File tuning profile ('throughput', 'small_reads', or 'archive').  See
+        save_dataset.  Defaults to None, for which h5py defaults are used.
+    """
+    is_str = len(data) > 0 and all(isinstance(val, str) for val in data)
+    if is_str:
+        elements = [_np.frombuffer(val.encode('utf-8'), dtype=_np.uint8)
+            for val in data]
+    else:
+        elements = [_np.atleast_1d(_np.asarray(val)) for val in data]
+    offsets = _np.zeros(len(elements) + 1, dtype=_np.int64)
+    offsets[1:] = _np.cumsum([len(val) for val in elements])
+    if len(elements) > 0:
+        values = _np.concatenate(elements)
+    else:
+        values = _np.zeros(0)
+    file_mode = _write_mode(filepath, overwrite)
+    with _h5py.File(
+            filepath, file_mode,
+            **_profile_kwargs(file_mode, profile)) as fid:
+        group = fid.create_group(name)
+        kwargs = {'chunks': True}
+        if compression_level is not None:
+            kwargs.update(
+                {'compression': 'gzip', 'compression_opts': compression_level})
+        group.create_dataset('values', data=values, **kwargs)
+        group.create_dataset('offsets', data=offsets)
+        group.attrs['ragged_type'] = 'str' if is_str else 'array'
+        if description is not None:
+            group.attrs['Description'] = description
+
+
+def load_ragged(
+    filepath, name='data', index=None, start_index=None, end_index=None,
+    profile=None):
+    """Load data saved by save_ragged from an HDF5 file.
+
+    Parameters
+    ----------
+    filepath: str
+        Path to HDF5 file.
+    name: str, optional
+        HDF5 group name (e.g., /group/ragged).  Defaults to 'data'.
+    index: int or array-like of int, optional
+        Index of a single element to load, which requires reading only that
+        element, or indices of many elements to load, which are read in as few
+        contiguous reads as possible.  Defaults to None, for which elements are
+        selected by start_index and end_index.
+    start_index: int, optional
+        Index of first element to load.  Ignored if index is given.  Defaults
+        to None, for which loading starts at the first element.
+    end_index: int, optional
+        Index after last element to load.  Ignored if index is given.  Defaults
+        to None, for which loading ends at the last element.  Ranges of
+        elements are loaded with a single contiguous read.
+    profile: str or None, optional
+        File tuning profile ('throughput', 'small_reads', or 'archive') whose
+        access settings (e.g., page buffer size) are used to open the file,
+        best matching the profile the file was saved with.  See save_dataset.
+        Defaults to None, for which h5py defaults are used.
+
+    Returns
+    -------
+    data: array-like or str, or list of array-like or str
+        A single element if index is an int, otherwise a list of elements.
+    """
+    with _h5py.File(filepath, 'r', **_access_kwargs(profile)) as fid:
+        group = fid[name]
+        values = group['values']
+        offsets = group['offsets']
+        is_str = group.attrs['ragged_type'] == 'str'
+
+        # Single element
+        if isinstance(index, (int, _np.integer)):
+            if index < 0:
+                index += offsets.shape[0] - 1
+            if not 0 <= index < offsets.shape[0] - 1:
+                raise IndexError('Index {} out of range'.format(index))
+            start, end = offsets[index:index + 2]
+            elements = [values[start:end]]
+
+        # Contiguous range of elements
+        elif index is None:
+            start, end, _ = slice(start_index, end_index).indices(
+                offsets.shape[0] - 1)
+            elements = []
+            if end > start:
+                bounds = offsets[start:end + 1]
+                block = values[bounds[0]:bounds[-1]]
+                elements = _np.split(block, bounds[1:-1] - bounds[0])
+
+        # Batch of elements, reading merged runs of values
+        else:
+            index = _np.asarray(index, dtype=_np.int64)
+            index = _np.where(index < 0, index + offsets.shape[0] - 1, index)
+            if _np.any((index < 0) | (index >= offsets.shape[0] - 1)):
+                raise IndexError('Index out of range')
+            unique = _np.unique(index)
+            unique_elements = []
+            if len(unique) > 0:
+                starts, ends = offsets[unique], offsets[unique + 1]
+                breaks = _np.nonzero(starts[1:] != ends[:-1])[0] + 1
+                for run in _np.split(_np.arange(len(unique)), breaks):
+                    block = values[starts[run[0]]:ends[run[-1]]]
+                    unique_elements += _np.split(
+                        block, starts[run[1:]] - starts[run[0]])
+            lookup = _np.searchsorted(unique, index)
+            elements = [unique_elements[idx] for idx in lookup]
+
+    if is_str:
+        elements = [val.tobytes().decode('utf-8') for val in elements]
+    if isinstance(index, (int, _np.integer)):
+        return elements[0]
+    return elements
+
+
+def save_sparse(
+    filepath, matrix, name='data', description=None, overwrite=True,
+    compression_level=None, profile=None):
+    """Save a scipy.sparse matrix to an HDF5 file, as a group containing its
+    components (e.g., data, indices, and indptr for CSR/CSC matrices) as
+    chunked datasets.  Requires scipy.
+
+    Parameters
+    ----------
+    filepath: str
+        Path to HDF5 file.
+    matrix: scipy.sparse matrix
+        Matrix to save.  CSR, CSC, and COO formats are saved as is (with COO
+        entries sorted by row), and other formats are converted to CSR.
+    name: str, optional
+        HDF5 group name (e.g., /group/matrix).  Defaults to 'data'.
+    description: str, optional
+        String describing matrix.  Description is saved as an HDF5 attribute of
+        the group.  Defaults to None, for which no description is saved.
+    overwrite: bool
+        If True, saving overwrites the file.  Otherwise, data is appended to the
+        file.  Defaults to True.
+    compression_level: int or None, optional
+        Integer from 0 to 9 specifying compression level for gzip filter, which
+        is applied to each component.  Defaults to None, for which no
+        compression/filter is applied.
+    profile: str or None, optional
+        File tuning profile ('throughput', 'small_reads', or 'archive').  See
+        save_dataset.  Defaults to None, for which h5py defaults are used.
+    """
+    if matrix.format not in ('csr', 'csc', 'coo'):
+        matrix = matrix.tocsr()
+    if matrix.format == 'coo':
+        # Sort entries by row (keeping duplicates in order) and store where
+        # each row starts, so that blocks of rows are read as slices
+        order = _np.argsort(matrix.row, kind='stable')
+        row_offsets = _np.zeros(matrix.shape[0] + 1, dtype=_np.int64)
+        row_offsets[1:] = _np.cumsum(
+            _np.bincount(matrix.row, minlength=matrix.shape[0]))
+        components = {
+            'data': matrix.data[order], 'row': matrix.row[order],
+            'col': matrix.col[order], 'row_offsets': row_offsets}
+    else:
+        components = {
+            'data': matrix.data, 'indices': matrix.indices,
+            'indptr': matrix.indptr}
+    kwargs = {}
+    if compression_level is not None:
+        kwargs = {'compression': 'gzip', 'compression_opts': compression_level}
+    file_mode = _write_mode(filepath, overwrite)
+    with _h5py.File(
+            filepath, file_mode,
+            **_profile_kwargs(file_mode, profile)) as fid:
+        group = fid.create_group(name)
+        for key, val in components.items():
+            group.create_dataset(key, data=val, chunks=True, **kwargs)
+        group.attrs['sparse_format'] = matrix.format
+        group.attrs['shape'] = matrix.shape
+        if description is not None:
+            group.attrs['Description'] = description
+
+
+def _load_sparse_block(group, start, end):
+    # Load the block of a sparse matrix spanning major-axis indices start to
+    # end (rows for CSR/COO, columns for CSC), from an open group
+    import scipy.sparse as _sparse
+    fmt = group.attrs['sparse_format']
+    shape = tuple(group.attrs['shape'])
+    major = 1 if fmt == 'csc' else 0
+    block_shape = list(shape)
+    block_shape[major] = end - start
+    if fmt == 'coo':
+        if 'row_offsets' in group:
+            row_offsets = group['row_offsets']
+            select = slice(row_offsets[start], row_offsets[end])
+            data, row, col = (
+                group[key][select] for key in ('data', 'row', 'col'))
+        else:
+            # Entries saved without row offsets may be in any order
+            row = group['row'][()]
+            mask = (row >= start) & (row < end)
+            data = group['data'][()][mask]
+            row = row[mask]
+            col = group['col'][()][mask]
+        return _sparse.coo_matrix(
+            (data, (row - start, col)), shape=tuple(block_shape))
+    indptr = group['indptr'][start:end + 1]
+    data = group['data'][indptr[0]:indptr[-1]]
+    indices = group['indices'][indptr[0]:indptr[-1]]
+    matrix_type = _sparse.csc_matrix if fmt == 'csc' else _sparse.csr_matrix
+    return matrix_type(
+        (data, indices, indptr - indptr[0]), shape=tuple(block_shape))
+
+
+def load_sparse(
+    filepath, name='data', start_index=None, end_index=None, profile=None):
+    """Load a scipy.sparse matrix saved by save_sparse from an HDF5 file.
+    Requires scipy.
+
+    Parameters
+    ----------
+    filepath: str
+        Path to HDF5 file.
+    name: str, optional
+        HDF5 group name (e.g., /group/matrix).  Defaults to 'data'.
+    start_index: int, optional
+        Start index for slicing along the major axis (rows for CSR/COO, columns
+        for CSC).  Only the stored values within the slice are read.
+        Defaults to None, for which no slicing will be done on the beginning of
+        the matrix.
+    end_index: int, optional
+        End index for slicing along the major axis.  Defaults to None, for which
+        no slicing will be done on the end of the matrix.
+    profile: str or None, optional
+        File tuning profile ('throughput', 'small_reads', or 'archive') whose
+        access settings (e.g., page buffer size) are used to open the file,
+        best matching the profile the file was saved with.  See save_dataset.
+        Defaults to None, for which h5py defaults are used.
+
+    Returns
+    -------
+    matrix: scipy.sparse matrix
+        Loaded matrix (or slice of it), in the format it was saved in.
+    """
+    with _h5py.File(filepath, 'r', **_access_kwargs(profile)) as fid:
+        group = fid[name]
+        major = 1 if group.attrs['sparse_format'] == 'csc' else 0
+        start, end, _ = slice(start_index, end_index).indices(
+            int(group.attrs['shape'][major]))
+        return _load_sparse_block(group, start, max(start, end))
+
+
+def sparse_dot(filepath, vector, name='data', block_size=65536, profile=None):
+    """Multiply a sparse matrix saved by save_sparse by a vector (or dense
+    matrix), reading the matrix from the HDF5 file one block at a time so that
+    it never has to fit in memory.  Requires scipy.
+
+    Parameters
+    ----------
+    filepath: str
+        Path to HDF5 file.
+    vector: array-like
+        Vector (or dense matrix) to multiply by, with as many rows as the
+        sparse matrix has columns.
+    name: str, optional
+        HDF5 group name (e.g., /group/matrix).  Defaults to 'data'.
+    block_size: int, optional
+        Number of rows (columns for CSC matrices) read per block.  Defaults to
+        65536.
+    profile: str or None, optional
+        File tuning profile ('throughput', 'small_reads', or 'archive') whose
+        access settings (e.g., page buffer size) are used to open the file,
+        best matching the profile the file was saved with.  See save_dataset.
+        Defaults to None, for which h5py defaults are used.
+
+    Returns
+    -------
+    product: array-like
+        Product of the sparse matrix and vector.
+    """
+    vector = _np.asarray(vector)
+    with _h5py.File(filepath, 'r', **_access_kwargs(profile)) as fid:
+        group = fid[name]
+        fmt = group.attrs['sparse_format']
+        num_rows, num_cols = (int(val) for val in group.attrs['shape'])
+        product = _np.zeros(
+            (num_rows,) + vector.shape[1:],
+            dtype=_np.result_type(group['data'].dtype, vector.dtype))
+
+        # CSC blocks span columns, which each contribute to the whole product
+        if fmt == 'csc':
+            for start in range(0, num_cols, block_size):
+                end = min(start + block_size, num_cols)
+                product += _load_sparse_block(group, start, end).dot(
+                    vector[start:end])
+
+        # COO entries are streamed in blocks of stored values
+        elif fmt == 'coo':
+            for start in range(0, group['data'].shape[0], block_size):
+                end = start + block_size
+                rows = group['row'][start:end]
+                terms = group['data'][start:end]
+                terms = terms.reshape(terms.shape + (1,) * (vector.ndim - 1))
+                _np.add.at(
+                    product, rows, terms * vector[group['col'][start:end]])
+
+        # CSR blocks span rows, which each fill a slice of the product
+        else:
+            for start in range(0, num_rows, block_size):
+                end = min(start + block_size, num_rows)
+                product[start:end] = _load_sparse_block(
+                    group, start, end).dot(vector)
+    return product
+
+
+def _tree_view(dset):
+    # Dataset, or a view decoding its values to str if it holds UTF-8 strings
+    # (e.g., a list of str saved by save_tree)
+    string_info = _h5py.check_string_dtype(dset.dtype)
+    if string_info is not None and string_info.encoding == 'utf-8':
+        return dset.asstr()
+    return dset
+
+
+class _LazyDataset(object):
+    # Proxy for a dataset returned by load_tree(lazy=True), which reads data
+    # from the file only when indexed or converted to an array
+    def __init__(self, filepath, name, shape, dtype, profile=None):
+        self.filepath = filepath
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+        self.profile = profile
+
+    def __repr__(self):
+        return '<lazy dataset "{}": shape {}, type "{}">'.format(
+            self.name, self.shape, self.dtype.str)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, index):
+        with _h5py.File(
+                self.filepath, 'r', **_access_kwargs(self.profile)) as fid:
+            return _tree_view(fid[self.name])[index]
+
+    def __array__(self, dtype=None, copy=None):
+        return _np.asarray(self[()], dtype=dtype)
+
+
+def _save_tree_group(fid, group_name, tree, compression_level):
+    # Recursively save a dict to a group, in an already open file
+    group = fid.require_group(group_name)
+    for key, val in tree.items():
+        subname = _posixpath.join(group_name, key)
+        if isinstance(val, dict):
+            _save_tree_group(fid, subname, val, compression_level)
+        elif isinstance(val, (str, bytes, bool, int, float, complex,
+                _np.generic)):
+            group.attrs[key] = val
+        else:
+            val = _np.asarray(val)
+            kwargs = {}
+            if val.dtype.kind in 'US':
+                # h5py cannot store numpy unicode arrays, so strings are saved
+                # as variable-length strings (UTF-8 for str, ASCII for bytes)
+                kwargs['dtype'] = _h5py.string_dtype(
+                    'utf-8' if val.dtype.kind == 'U' else 'ascii')
+                val = val.astype(object)
+            if compression_level is not None and val.ndim > 0:
+                kwargs.update(
+                    {'compression': 'gzip',
+                     'compression_opts': compression_level})
+            fid.create_dataset(subname, data=val, **kwargs)
+
+
+def save_tree(
+    filepath, tree, name='/', overwrite=True, compression_level=None,
+    profile=None):
+    """Save a nested dictionary to an HDF5 file, opening the file only once.
+    Dictionaries are saved as groups, strings and scalars as attributes of the
+    enclosing group, and everything else (e.g., arrays and lists) as datasets.
+    Arrays/lists of strings are saved as variable-length string datasets.
+
+    Parameters
+    ----------
+    filepath: str
+        Path to HDF5 file.
+    tree: dict
+        Nested dictionary to save.
+    name: str, optional
+        HDF5 group name (e.g., /group) under which the tree is saved.  Defaults
+        to root group ('/').
+    overwrite: bool
+        If True, saving overwrites the file.  Otherwise, the tree is appended
+        to the file.  Defaults to True.
+    compression_level: int or None, optional
+        Integer from 0 to 9 specifying compression level for gzip filter, which
+        is applied to each (non-scalar) dataset.  Defaults to None, for which no
+        compression/filter is applied.
+    profile: str or None, optional
+        File tuning profile ('throughput', 'small_reads', or 'archive').  See
+        save_dataset.  Defaults to None, for which h5py defaults are used.
+    """
+    file_mode = _write_mode(filepath, overwrite)
+    with _h5py.File(
+            filepath, file_mode,
+            **_profile_kwargs(file_mode, profile)) as fid:
+        _save_tree_group(fid, _abs_name(name), tree, compression_level)
+
+
+def load_tree(filepath, name='/', lazy=False, profile=None):
+    """Load an HDF5 group into a nested dictionary, opening the file only once
+    (the inverse of save_tree).  Groups are loaded as dictionaries, datasets as
+    arrays, and group attributes as entries of the corresponding dictionary.
+    UTF-8 string datasets (e.g., lists of str saved by save_tree) are loaded as
+    str rather than bytes.
+
+    Parameters
+    ----------
+    filepath: str
+        Path to HDF5 file.
+    name: str, optional
+        HDF5 group name (e.g., /group).  Defaults to root group ('/').
+    lazy: bool, optional
+        If True, datasets are returned as proxies with shape and dtype
+        attributes, which read data from the file only when indexed (e.g.,
+        proxy[:10]) or converted to an array (e.g., numpy.asarray(proxy)).
+        Defaults to False.
+    profile: str or None, optional
+        File tuning profile ('throughput', 'small_reads', or 'archive') whose
+        access settings (e.g., page buffer size) are used to open the file,
+        best matching the profile the file was saved with.  See save_dataset.
+        Defaults to None, for which h5py defaults are used.
+
+    Returns
+    -------
+    tree: dict
+        Nested dictionary of loaded groups, datasets, and attributes.
+    """
+    def load_group(group):
+        tree = dict(group.attrs)
+        for key, val in group.items():
+            if _is_private(key):
+                continue
+            if isinstance(val, _h5py.Group):
+                tree[key] = load_group(val)
+            elif lazy:
+                tree[key] = _LazyDataset(
+                    filepath, val.name, val.shape, val.dtype, profile=profile)
+            else:
+                tree[key] = _tree_view(val)[()]
+        return tree
+
+    with _h5py.File(filepath, 'r', **_access_kwargs(profile)) as fid:
+        return load_group(fid[name])
+
+
 def to_npz(h5_filepath, npz_filepath, name='/'):
     """Save an HDF5 group/dataset to NPZ (compressed numpy archive) format.
     Subgroups such as path/group/subgroup/dataset will be saved with array names
@@ -370,6 +1724,8 @@ def to_npz(h5_filepath, npz_filepath, name='/'):
                     names_to_check.remove(subname)
                 elif isinstance(fid[subname], _h5py.Group):
                     for subsubname in fid[subname]:
+                        if _is_private(subsubname):
+                            continue
                         names_to_check.append(
                             fid['{}/{}'.format(subname, subsubname)].name)
                     names_to_check.remove(subname)
@@ -398,7 +1754,7 @@ def to_npz(h5_filepath, npz_filepath, name='/'):
 
 
 # Convert from NPZ (numpy archive) format
-def from_npz(npz_filepath, h5_filepath):
+def from_npz(npz_filepath, h5_filepath, profile=None):
     """Load data from an NPZ (compressed numpy archive) file and save to HDF5.
     NPZ array names are preserved.
 
@@ -408,6 +1764,9 @@ def from_npz(npz_filepath, h5_filepath):
         Path to NPZ file.
     h5_filepath: str
         Path to HDF5 file.
+    profile: str or None, optional
+        File tuning profile ('throughput', 'small_reads', or 'archive').  See
+        save_dataset.  Defaults to None, for which h5py defaults are used.
     """
     # Open file for processing
     with _np.load(npz_filepath) as data:
@@ -417,6 +1776,461 @@ def from_npz(npz_filepath, h5_filepath):
 
             # Save to HDF5
             if idx == 0:
-                save_dataset(h5_filepath, val, name=key)
+                save_dataset(h5_filepath, val, name=key, profile=profile)
+            else:
+                append_dataset(h5_filepath, val, name=key, profile=profile)
+
+
+# File name of the attribute manifest written by to_npy_dir
+_NPY_MANIFEST = 'manifest.json'
+
+
+def _attr_to_json(val):
+    # Encode an attribute value, keeping its type so it can be restored
+    val = _np.asarray(val)
+    if val.dtype.kind in 'OSU':
+        text = _np.vectorize(
+            lambda item: item.decode('utf-8') if isinstance(item, bytes)
+            else str(item), otypes=[object])(val)
+        return {'dtype': 'str', 'value': text.tolist()}
+    if val.dtype.kind == 'c':
+        return {
+            'dtype': val.dtype.str,
+            'value': [val.real.tolist(), val.imag.tolist()]}
+    return {'dtype': val.dtype.str, 'value': val.tolist()}
+
+
+def _attrs_to_json(attrs):
+    # Encode a set of attributes, skipping those used internally by high5py
+    return {
+        key: _attr_to_json(val) for key, val in attrs.items()
+        if not _is_private(key)}
+
+
+def _attr_from_json(entry):
+    # Decode an attribute value encoded by _attr_to_json
+    if entry['dtype'] == 'str':
+        val = entry['value']
+        return val if isinstance(val, str) else _np.array(
+            val, dtype=_h5py.string_dtype())
+    dtype = _np.dtype(entry['dtype'])
+    if dtype.kind == 'c':
+        real, imag = entry['value']
+        val = _np.asarray(real) + 1j * _np.asarray(imag)
+    else:
+        val = entry['value']
+    return _np.asarray(val, dtype=dtype)[()]
+
+
+def _block_rows(shape, itemsize, max_block_bytes):
+    # Number of leading-axis rows that fit in a block of bounded size
+    row_bytes = itemsize * int(_np.prod(shape[1:], dtype=_np.int64))
+    return max(1, max_block_bytes // max(1, row_bytes))
+
+
+def _dataset_to_npy(dset, npy_path, max_block_bytes):
+    # Stream a dataset to an uncompressed .npy file one block at a time
+    is_str = _h5py.check_string_dtype(dset.dtype) is not None
+    if dset.ndim == 0 or dset.size == 0:
+        _np.save(
+            npy_path,
+            _np.asarray(dset.asstr()[()], dtype=str) if is_str else dset[()])
+        return
+    step = _block_rows(dset.shape, dset.dtype.itemsize, max_block_bytes)
+    starts = range(0, dset.shape[0], step)
+    dtype = dset.dtype
+    if is_str:
+        # NPY strings have a fixed width, which is found in a first pass
+        width = 1
+        for start in starts:
+            block = _np.asarray(dset.asstr()[start:start + step], dtype=str)
+            width = max(width, block.dtype.itemsize // 4)
+        dtype = _np.dtype('U{:d}'.format(width))
+    out = _np.lib.format.open_memmap(
+        npy_path, mode='w+', dtype=dtype, shape=dset.shape)
+    for start in starts:
+        end = min(start + step, dset.shape[0])
+        if is_str:
+            out[start:end] = dset.asstr()[start:end]
+        else:
+            dset.read_direct(
+                out, source_sel=_np.s_[start:end], dest_sel=_np.s_[start:end])
+    out.flush()
+    del out
+
+
+def _file_dataset_to_npy(h5_filepath, name, npy_path, max_block_bytes):
+    # Stream a dataset to an .npy file from a worker process, which opens the
+    # HDF5 file on its own
+    with _h5py.File(h5_filepath, 'r') as fid:
+        _dataset_to_npy(fid[name], npy_path, max_block_bytes)
+
+
+def to_npy_dir(
+    h5_filepath, out_dir, name='/', max_block_bytes=2**26, num_workers=None):
+    """Save an HDF5 group/dataset to a directory of uncompressed NPY files,
+    which can be memory-mapped (e.g., by from_npy_dir or numpy.load with
+    mmap_mode='r').  The directory tree mirrors the HDF5 groups, so that a
+    dataset path/group/dataset is saved as path/group/dataset.npy.  Attributes
+    are saved to a JSON manifest in the top-level directory.  A dataset with
+    several names (hard links) is saved once per name.
+
+    Parameters
+    ----------
+    h5_filepath: str
+        Path to HDF5 file.
+    out_dir: str
+        Path to output directory, which is created if it does not exist.
+    name: str, optional
+        HDF5 group/dataset name (e.g., /group/dataset).  Defaults to root group
+        ('/').
+    max_block_bytes: int, optional
+        Maximum size in bytes of each block of data read from the HDF5 file and
+        written to an NPY file, which bounds memory use.  Defaults to 2**26 (64
+        MiB).
+    num_workers: int or None, optional
+        Number of worker processes that write datasets in parallel, each
+        opening the HDF5 file for reading on its own.  Processes (rather than
+        threads, which h5py serializes) speed up exports of many datasets,
+        especially compressed ones, since decompression is CPU-bound.
+        Requires h5_filepath to be a path.  Defaults to None, for which
+        datasets are written one at a time.
+    """
+    if num_workers is not None and not isinstance(h5_filepath, str):
+        raise ValueError('num_workers requires h5_filepath to be a path')
+    jobs = []
+    with _h5py.File(h5_filepath, 'r') as fid:
+
+        # Collect objects by link, with paths relative to the root, so that
+        # every name of a hard-linked object is included
+        root = fid[name]
+        if isinstance(root, _h5py.Dataset):
+            root_name = _posixpath.dirname(root.name)
+            objects = {_posixpath.basename(root.name): root}
+            attributes = {}
+        else:
+            root_name = root.name
+            objects = {}
+            groups_to_check = [('', root)]
+            while len(groups_to_check) > 0:
+                prefix, group = groups_to_check.pop()
+                for subname in group:
+                    if _is_private(subname):
+                        continue
+                    key = prefix + subname
+                    objects[key] = group[subname]
+                    if isinstance(objects[key], _h5py.Group):
+                        groups_to_check.append((key + '/', objects[key]))
+            attributes = {'/': _attrs_to_json(root.attrs)}
+        manifest = {'attributes': attributes, 'groups': [], 'datasets': {}}
+        for key, obj in sorted(objects.items()):
+            path = _os.path.join(out_dir, *key.split('/'))
+            if isinstance(obj, _h5py.Group):
+                _os.makedirs(path, exist_ok=True)
+                manifest['groups'].append(key)
+            else:
+                _os.makedirs(_os.path.dirname(path), exist_ok=True)
+                manifest['datasets'][key] = key + '.npy'
+                if num_workers is None:
+                    _dataset_to_npy(obj, path + '.npy', max_block_bytes)
+                else:
+                    jobs.append(
+                        (_posixpath.join(root_name, key), path + '.npy'))
+            attrs = _attrs_to_json(obj.attrs)
+            if len(attrs) > 0:
+                manifest['attributes'][key] = attrs
+
+    # Write datasets in worker processes
+    if len(jobs) > 0:
+        with _futures.ProcessPoolExecutor(num_workers) as executor:
+            for future in [
+                    executor.submit(
+                        _file_dataset_to_npy, h5_filepath, dset_name, npy_path,
+                        max_block_bytes)
+                    for dset_name, npy_path in jobs]:
+                future.result()
+
+    # Save manifest
+    _os.makedirs(out_dir, exist_ok=True)
+    with open(_os.path.join(out_dir, _NPY_MANIFEST), 'w') as manifest_file:
+        _json.dump(manifest, manifest_file, indent=1)
+
+
+def from_npy_dir(
+    npy_dir, h5_filepath, name='/', overwrite=True, compression_level=None,
+    max_block_bytes=2**26, profile=None):
+    """Load data from a directory of NPY files (e.g., saved by to_npy_dir) and
+    save to HDF5.  NPY files are memory-mapped and copied one block at a time,
+    so they are never fully loaded into memory.  Subdirectories are saved as
+    groups, and attributes are restored from the JSON manifest, if any.
+
+    Parameters
+    ----------
+    npy_dir: str
+        Path to directory of NPY files.
+    h5_filepath: str
+        Path to HDF5 file.
+    name: str, optional
+        HDF5 group name (e.g., /group) under which datasets are saved.
+        Defaults to root group ('/').
+    overwrite: bool
+        If True, saving overwrites the file.  Otherwise, data is appended to the
+        file.  Defaults to True.
+    compression_level: int or None, optional
+        Integer from 0 to 9 specifying compression level for gzip filter.
+        Defaults to None, for which no compression/filter is applied.
+    max_block_bytes: int, optional
+        Maximum size in bytes of each block of data copied.  Defaults to 2**26
+        (64 MiB).
+    profile: str or None, optional
+        File tuning profile ('throughput', 'small_reads', or 'archive').  See
+        save_dataset.  Defaults to None, for which h5py defaults are used.
+    """
+    # Find datasets, from the manifest if available
+    manifest_path = _os.path.join(npy_dir, _NPY_MANIFEST)
+    if _os.path.exists(manifest_path):
+        with open(manifest_path) as manifest_file:
+            manifest = _json.load(manifest_file)
+    else:
+        keys = [
+            _os.path.relpath(path, npy_dir).replace(_os.sep, '/')[:-4]
+            for path in _glob.glob(
+                _os.path.join(npy_dir, '**', '*.npy'), recursive=True)]
+        manifest = {
+            'attributes': {}, 'groups': [],
+            'datasets': {key: key + '.npy' for key in keys}}
+
+    file_mode = _write_mode(h5_filepath, overwrite)
+    with _h5py.File(
+            h5_filepath, file_mode,
+            **_profile_kwargs(file_mode, profile)) as fid:
+        group = fid.require_group(name)
+        for key in manifest['groups']:
+            group.require_group(key)
+        for key, npy_name in sorted(manifest['datasets'].items()):
+            data = _np.load(
+                _os.path.join(npy_dir, *npy_name.split('/')), mmap_mode='r')
+            if data.dtype.kind == 'U':
+                group.create_dataset(
+                    key, data=data.astype(object),
+                    dtype=_h5py.string_dtype())
+                continue
+            kwargs = {}
+            if compression_level is not None and data.ndim > 0:
+                kwargs = {
+                    'compression': 'gzip',
+                    'compression_opts': compression_level}
+            dset = group.create_dataset(
+                key, shape=data.shape, dtype=data.dtype, **kwargs)
+            if data.ndim == 0:
+                dset[()] = data[()]
+                continue
+            step = _block_rows(data.shape, data.dtype.itemsize, max_block_bytes)
+            for start in range(0, data.shape[0], step):
+                dset[start:start + step] = data[start:start + step]
+        for key, attrs in manifest['attributes'].items():
+            obj = group if key == '/' else group[key]
+            for attr_key, entry in attrs.items():
+                obj.attrs[attr_key] = _attr_from_json(entry)
+
+
+def _zone_map_name(name):
+    # Name of the group holding the zone map of a dataset, with the path
+    # quoted so that all zone maps sit directly in one group
+    return '{}/{}'.format(_ZONE_MAP_GROUP, _quote(_abs_name(name), safe=''))
+
+
+def _get_zone_map(fid, name):
+    # Zone map group of a dataset, or None if it has none
+    zone_map = fid.get(_zone_map_name(name))
+    if (isinstance(zone_map, _h5py.Group) and 'axis' in zone_map.attrs and
+            'zone_size' in zone_map.attrs):
+        return zone_map
+    return None
+
+
+def _zone_maps_under(fid, name):
+    # Names of datasets at or below an HDF5 name that have zone maps
+    group = fid.get(_ZONE_MAP_GROUP)
+    if group is None:
+        return []
+    name = _abs_name(name)
+    prefix = name.rstrip('/') + '/'
+    paths = [_unquote(key) for key in group]
+    return [
+        path for path in paths
+        if (path == name or path.startswith(prefix)) and
+        _get_zone_map(fid, path) is not None]
+
+
+def _can_zone_map(data):
+    # True if a dataset/array can have a zone map
+    return data.ndim in (1, 2) and data.dtype.kind in 'iufb'
+
+
+def _zone_stats(block, axis):
+    # Min and max of a block over the zone axis, for each column (or row, if
+    # axis is 1), ignoring NaNs
+    block = _np.moveaxis(block, axis, 0).reshape(block.shape[axis], -1)
+    return _np.fmin.reduce(block, axis=0), _np.fmax.reduce(block, axis=0)
+
+
+def _update_zone_map(dset, zone_map, start):
+    # Recompute zone statistics from the zone containing index start through
+    # the end of the dataset
+    axis = int(zone_map.attrs['axis'])
+    zone_size = int(zone_map.attrs['zone_size'])
+    length = dset.shape[axis]
+    num_zones = -(-length // zone_size)
+    for key in ('min', 'max'):
+        zone_map[key].resize(num_zones, axis=0)
+    for zone in range(start // zone_size, num_zones):
+        index = [slice(None)] * dset.ndim
+        index[axis] = slice(zone * zone_size, (zone + 1) * zone_size)
+        zone_map['min'][zone], zone_map['max'][zone] = _zone_stats(
+            dset[tuple(index)], axis)
+    zone_map['num_rows'][()] = length
+
+
+def build_zone_map(
+    filepath, name='data', axis=0, zone_size=None, profile=None):
+    """Build a zone map for a 1D/2D dataset, which stores the min and max of
+    each column within each block (zone) of rows, so that query_dataset can
+    skip zones that cannot contain matching rows.  The zone map is saved in a
+    private group, hidden from listings and exports.  It is kept up to date
+    by delete, rename, replace_dataset, and SWMRWriter.  Rows added by other means are still
+    queried correctly, but are not skipped until the zone map is rebuilt.
+
+    Parameters
+    ----------
+    filepath: str
+        Path to HDF5 file.
+    name: str, optional
+        HDF5 dataset name (e.g., /group/dataset).  Defaults to 'data'.
+    axis: int, optional
+        Axis along which rows are indexed, 0 or 1.  With axis=1, the roles of
+        rows and columns are swapped.  Defaults to 0.
+    zone_size: int or None, optional
+        Number of rows per zone.  Defaults to None, for which the chunk size
+        along the axis is used for chunked datasets, and 65536 otherwise.
+    profile: str or None, optional
+        File tuning profile ('throughput', 'small_reads', or 'archive').  See
+        save_dataset.  Defaults to None, for which h5py defaults are used.
+    """
+    # Files that support SWMR get a zone map in the latest format, which
+    # SWMRWriter requires to update it while streaming
+    kwargs = _profile_kwargs('a', profile)
+    if 'libver' not in kwargs:
+        with _h5py.File(filepath, 'r') as fid:
+            if fid.id.get_create_plist().get_version()[0] >= 3:
+                kwargs['libver'] = 'latest'
+    with _h5py.File(filepath, 'a', **kwargs) as fid:
+        dset = fid[name]
+        if not _can_zone_map(dset):
+            raise ValueError(
+                'Zone maps require a 1D or 2D dataset of real numbers')
+        axis = axis % dset.ndim
+        if zone_size is None:
+            zone_size = 65536 if dset.chunks is None else dset.chunks[axis]
+        if _zone_map_name(name) in fid:
+            del fid[_zone_map_name(name)]
+        zone_map = fid.create_group(_zone_map_name(name))
+        zone_map.attrs['axis'] = axis
+        zone_map.attrs['zone_size'] = zone_size
+        num_fields = 1 if dset.ndim == 1 else dset.shape[1 - axis]
+        for key in ('min', 'max'):
+            zone_map.create_dataset(
+                key, shape=(0, num_fields), dtype=dset.dtype,
+                maxshape=(None, num_fields), chunks=True)
+        zone_map.create_dataset('num_rows', data=0, dtype=_np.int64)
+        _update_zone_map(dset, zone_map, 0)
+
+
+def query_dataset(
+    filepath, name='data', where=(None, None), column=None, profile=None):
+    """Load the rows of a 1D/2D dataset for which a column lies within a
+    range.  If the dataset has a zone map (see build_zone_map), only the zones
+    that may contain matching rows are read.
+
+    Parameters
+    ----------
+    filepath: str
+        Path to HDF5 file.
+    name: str, optional
+        HDF5 dataset name (e.g., /group/dataset).  Defaults to 'data'.
+    where: tuple, optional
+        Lower and upper bounds (inclusive) on the column values.  Either bound
+        can be None, for no bound.  Defaults to (None, None), for which all
+        rows are returned.
+    column: int or None, optional
+        Index of the column to compare (of the row, if the zone map uses
+        axis=1).  Required for 2D datasets.  Defaults to None.
+    profile: str or None, optional
+        File tuning profile ('throughput', 'small_reads', or 'archive') whose
+        access settings (e.g., page buffer size) are used to open the file,
+        best matching the profile the file was saved with.  See save_dataset.
+        Defaults to None, for which h5py defaults are used.
+
+    Returns
+    -------
+    data: array-like
+        Matching rows, in order.
+    """
+    low, high = where
+    with _h5py.File(filepath, 'r', **_access_kwargs(profile)) as fid:
+        dset = fid[name]
+        zone_map = _get_zone_map(fid, name)
+        if dset.ndim == 1:
+            column = 0
+        elif column is None:
+            raise ValueError('A column must be given for 2D datasets')
+        if zone_map is None:
+            axis = 0
+            zone_size = 65536 if dset.chunks is None else dset.chunks[0]
+            covered = 0
+        else:
+            axis = int(zone_map.attrs['axis'])
+            zone_size = int(zone_map.attrs['zone_size'])
+            covered = min(int(zone_map['num_rows'][()]), dset.shape[axis])
+        shape = list(dset.shape)
+        length = shape[axis]
+
+        # Find candidate zones.  Rows not covered by the zone map are always
+        # candidates, including those in a partially covered zone.
+        candidates = _np.ones(-(-length // zone_size), dtype=bool)
+        if covered == length:
+            num_covered = len(candidates)
+        else:
+            num_covered = covered // zone_size
+        if num_covered > 0:
+            mins = zone_map['min'][:num_covered, column]
+            maxs = zone_map['max'][:num_covered, column]
+            if low is not None:
+                candidates[:num_covered] &= maxs >= low
+            if high is not None:
+                candidates[:num_covered] &= mins <= high
+
+        # Read runs of adjacent candidate zones and filter their rows
+        zones = _np.nonzero(candidates)[0]
+        breaks = _np.nonzero(_np.diff(zones) != 1)[0] + 1
+        results = []
+        for run in _np.split(zones, breaks):
+            if len(run) == 0:
+                continue
+            index = [slice(None)] * dset.ndim
+            index[axis] = slice(run[0] * zone_size, (run[-1] + 1) * zone_size)
+            block = dset[tuple(index)]
+            if dset.ndim == 1:
+                values = block
             else:
-                append_dataset(h5_filepath, val, name=key)
+                values = _np.take(block, column, axis=1 - axis)
+            mask = _np.ones(values.shape, dtype=bool)
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+            results.append(_np.compress(mask, block, axis=axis))
+        if len(results) == 0:
+            shape[axis] = 0
+            return _np.zeros(shape, dtype=dset.dtype)
+    return _np.concatenate(results, axis=axis)
@@ -1,6 +1,9 @@
 import unittest as _unittest
 import os as _os
+import json as _json
 import shutil as _shutil
+import subprocess as _subprocess
+import sys as _sys
 
 import numpy as _np
 import h5py as _h5py
@@ -97,6 +100,25 @@ class TestHigh5Py(_unittest.TestCase):
             self._helper_assert_equal(saved_data, true_data)
 
 
+    # Check that importing high5py does not import heavy dependencies, which
+    # should be loaded lazily on first use
+    def test_lazy_import(self):
+        heavy_modules = ['h5py', 'numpy', 'unittest', 'high5py.testhigh5py']
+        loaded = _subprocess.check_output(
+            [_sys.executable, '-c', (
+                'import sys, high5py; '
+                'print(" ".join(m for m in {} if m in sys.modules))').format(
+                    heavy_modules)],
+            cwd=_os.path.dirname(_os.path.dirname(_os.path.abspath(__file__))))
+        self.assertEqual(loaded.decode().split(), [])
+        self.assertTrue(callable(_hi5.run_all_tests))
+        self.assertTrue(set(_hi5.__all__) <= set(dir(_hi5)))
+        _hi5.info
+        self.assertEqual(len(dir(_hi5)), len(set(dir(_hi5))))
+        with self.assertRaises(AttributeError):
+            _hi5.nonexistent
+
+
     # Check that existence of groups/datasets can be queried correctly
     def test_exists(self):
         with _h5py.File(self.filepath, 'w') as fid:
@@ -136,6 +158,92 @@ class TestHigh5Py(_unittest.TestCase):
                     self.assertFalse('old_data' in fid['/'])
 
 
+    # Check that file tuning profiles are applied when files are created, and
+    # do not interfere with appending to existing files
+    def test_profiles(self):
+        for profile in ['throughput', 'small_reads', 'archive']:
+            _hi5.save_dataset(
+                self.filepath, self.float_array, name='x', profile=profile)
+            _hi5.append_dataset(
+                self.filepath, self.int_array, name='y', profile=profile)
+            with _h5py.File(self.filepath, 'r') as fid:
+                fcpl = fid.id.get_create_plist()
+                self.assertTrue(fcpl.get_version()[0] >= 2)
+                strategy = fcpl.get_file_space_strategy()
+                self.assertEqual(
+                    strategy[0] == _h5py.h5f.FSPACE_STRATEGY_PAGE,
+                    profile != 'archive')
+                _np.testing.assert_array_equal(fid['x'][()], self.float_array)
+                _np.testing.assert_array_equal(fid['y'][()], self.int_array)
+
+        # Append to a file created with defaults, and to an in-memory file
+        _hi5.save_dataset(self.filepath, self.float_array, name='x')
+        _hi5.append_dataset(
+            self.filepath, self.int_array, name='y', profile='throughput')
+        _np.testing.assert_array_equal(
+            _hi5.load_dataset(self.filepath, 'y'), self.int_array)
+        fileobj = _hi5.loads(_hi5.dumps(self.int_array, profile='small_reads'))
+        _hi5.append_dataset(
+            fileobj, self.float_array, name='x', profile='archive')
+        _np.testing.assert_array_equal(
+            _hi5.load_dataset(fileobj, 'x'), self.float_array)
+        with self.assertRaises(ValueError):
+            _hi5.save_dataset(self.filepath, 1, profile='unknown')
+
+        # Appending creates a missing file with the profile's settings
+        _os.remove(self.filepath)
+        _hi5.append_dataset(
+            self.filepath, self.int_array, name='y', profile='archive')
+        with _h5py.File(self.filepath, 'r') as fid:
+            self.assertEqual(
+                fid.id.get_create_plist().get_file_space_strategy()[:2],
+                (_h5py.h5f.FSPACE_STRATEGY_FSM_AGGR, True))
+
+        # Readers open files with the access settings of a profile
+        _hi5.save_dataset(
+            self.filepath, self.float_array, name='group/x',
+            profile='small_reads')
+        for profile in ['throughput', 'small_reads', 'archive']:
+            _np.testing.assert_array_equal(
+                _hi5.load_dataset(self.filepath, 'group/x', profile=profile),
+                self.float_array)
+            self.assertEqual(
+                _hi5.info(
+                    self.filepath, 'group', return_info=True,
+                    profile=profile)['datasets'], ['x'])
+            tree = _hi5.load_tree(self.filepath, lazy=True, profile=profile)
+            _np.testing.assert_array_equal(
+                tree['group']['x'][:], self.float_array)
+        with self.assertRaises(ValueError):
+            _hi5.load_dataset(self.filepath, 'group/x', profile='unknown')
+
+        # Converting from NPZ, and zone maps, take a profile too
+        npz_path = self.outdir + 'data.npz'
+        _np.savez(npz_path, x=self.float_array, y=self.int_array)
+        _hi5.from_npz(npz_path, self.filepath, profile='small_reads')
+        with _h5py.File(self.filepath, 'r') as fid:
+            self.assertEqual(
+                fid.id.get_create_plist().get_file_space_strategy()[0],
+                _h5py.h5f.FSPACE_STRATEGY_PAGE)
+        _hi5.build_zone_map(self.filepath, 'x', profile='small_reads')
+        _np.testing.assert_array_equal(
+            _hi5.query_dataset(
+                self.filepath, 'x', column=0, profile='small_reads'),
+            self.float_array)
+
+        # SWMRWriter and sync create files with a profile
+        with _hi5.SWMRWriter(
+                self.filepath, name='z', profile='throughput') as writer:
+            writer.append(_np.arange(3.))
+        dst_path = self.outdir + 'dst.h5'
+        _hi5.sync(self.filepath, dst_path, profile='small_reads')
+        for filepath in [self.filepath, dst_path]:
+            with _h5py.File(filepath, 'r') as fid:
+                self.assertEqual(
+                    fid.id.get_create_plist().get_file_space_strategy()[0],
+                    _h5py.h5f.FSPACE_STRATEGY_PAGE)
+
+
     # Check that datasets can be appended correctly, with and without
     # compression
     def test_append_dataset(self):
@@ -219,6 +327,253 @@ class TestHigh5Py(_unittest.TestCase):
                     self.assertTrue(new_dset in list(fid[new_grp]))
 
 
+    # Check that identical datasets are hard linked when deduping, and that the
+    # index stays consistent through deletes and renames
+    def test_dedupe(self):
+        data = _np.random.random((20, 30))
+        _hi5.save_dataset(self.filepath, data, name='a/x', dedupe=True)
+        _hi5.append_dataset(self.filepath, data, name='b/x', dedupe=True)
+        _hi5.append_dataset(self.filepath, 2 * data, name='c/x', dedupe=True)
+        _hi5.append_dataset(self.filepath, data, name='d/x', dedupe=False)
+        with _h5py.File(self.filepath, 'r') as fid:
+            self.assertEqual(fid['a/x'].id, fid['b/x'].id)
+            self.assertNotEqual(fid['a/x'].id, fid['c/x'].id)
+            self.assertNotEqual(fid['a/x'].id, fid['d/x'].id)
+        info = _hi5.dedupe_report(self.filepath, return_info=True)
+        self.assertEqual(info['unique_datasets'], 2)
+        self.assertEqual(info['linked_names'], 3)
+        self.assertEqual(info['uncompressed_bytes_saved'], data.nbytes)
+
+        # Links must survive deleting/renaming the original name
+        _hi5.delete(self.filepath, 'a')
+        _hi5.rename(self.filepath, 'b', 'e')
+        _hi5.append_dataset(self.filepath, data, name='f', dedupe=True)
+        with _h5py.File(self.filepath, 'r') as fid:
+            self.assertEqual(fid['e/x'].id, fid['f'].id)
+        _np.testing.assert_array_equal(
+            _hi5.load_dataset(self.filepath, 'f'), data)
+        _hi5.delete(self.filepath, 'e/x')
+        _hi5.delete(self.filepath, 'f')
+        _hi5.delete(self.filepath, 'c')
+        with _h5py.File(self.filepath, 'r') as fid:
+            self.assertEqual(len(fid['_high5py_dedupe']), 0)
+
+        # The index is hidden from attributes, listings, and trees
+        _hi5.append_dataset(self.filepath, data, name='g', dedupe=True)
+        self.assertEqual(_hi5.load_attributes(self.filepath, '/'), {})
+        self.assertEqual(
+            _hi5.info(self.filepath, return_info=True)['groups'], ['d', 'e'])
+        self.assertFalse(any(
+            '_high5py' in name
+            for name in _hi5.list_all(self.filepath, return_info=True)))
+        self.assertEqual(
+            sorted(_hi5.load_tree(self.filepath)), ['d', 'e', 'g'])
+
+        # Links are only made to datasets whose description still matches
+        _hi5.save_dataset(
+            self.filepath, data, name='h', description='A', dedupe=True)
+        _hi5.save_attributes(self.filepath, {'Description': 'B'}, name='h')
+        _hi5.append_dataset(
+            self.filepath, data, name='i', description='A', dedupe=True)
+        _hi5.append_dataset(self.filepath, 3 * data, name='j', dedupe=True)
+        _hi5.append_dataset(
+            self.filepath, 3 * data, name='k', description='None',
+            dedupe=True)
+        self.assertEqual(
+            _hi5.load_attributes(self.filepath, 'h'), {'Description': 'B'})
+        self.assertEqual(
+            _hi5.load_attributes(self.filepath, 'i'), {'Description': 'A'})
+        self.assertEqual(_hi5.load_attributes(self.filepath, 'j'), {})
+        self.assertEqual(
+            _hi5.load_attributes(self.filepath, 'k'), {'Description': 'None'})
+
+
+    # Check that deduplicating many copies of the same array keeps the file
+    # small, rather than growing the index with every save
+    def test_dedupe_file_size(self):
+        data = _np.arange(100.)
+        sizes = {}
+        for dedupe in [False, True]:
+            filepath = self.outdir + 'dedupe_{}.h5'.format(dedupe)
+            _hi5.save_tree(filepath, {})
+            for idx in range(300):
+                _hi5.append_dataset(
+                    filepath, data, name='x{:d}'.format(idx), dedupe=dedupe)
+            sizes[dedupe] = _os.path.getsize(filepath)
+        self.assertTrue(sizes[True] < sizes[False] / 2)
+        info = _hi5.dedupe_report(filepath, return_info=True)
+        self.assertEqual(info['linked_names'], 300)
+        self.assertEqual(info['uncompressed_bytes_saved'], 299 * data.nbytes)
+
+
+    # Check that rows appended in SWMR mode can be followed by a reader while
+    # the file is still open for writing
+    def test_swmr(self):
+        filepath = self.outdir + 'stream.h5'
+        data = _np.random.random((7, 3))
+        with _hi5.SWMRWriter(
+            filepath, name='group/stream', row_shape=(3,), chunk_rows=4
+            ) as writer:
+            writer.append(data[:2])
+            tail = _hi5.tail_dataset(
+                filepath, name='group/stream', poll_interval=0.01, timeout=0.5)
+            _np.testing.assert_array_equal(next(tail), data[:2])
+            writer.append(data[2:3])
+            writer.append(data[3:])
+            _np.testing.assert_array_equal(next(tail), data[2:])
+            self.assertEqual(list(tail), [])
+
+        # Reopening an existing dataset appends to the end
+        with _hi5.SWMRWriter(filepath, name='group/stream') as writer:
+            writer.append(data)
+        _np.testing.assert_array_equal(
+            _hi5.load_dataset(filepath, 'group/stream'),
+            _np.concatenate((data, data)))
+        tail = _hi5.tail_dataset(
+            filepath, name='group/stream', start_index=None, timeout=0)
+        self.assertEqual(list(tail), [])
+
+        # Files saved with the default file format are rejected untouched,
+        # while files saved with a profile can be streamed to
+        _hi5.save_dataset(filepath, data, name='x')
+        with self.assertRaises(ValueError):
+            _hi5.SWMRWriter(filepath, name='stream')
+        self.assertFalse(_hi5.exists(filepath, 'stream'))
+        for profile in ['throughput', 'small_reads', 'archive']:
+            _hi5.save_dataset(filepath, data, name='x', profile=profile)
+            with _hi5.SWMRWriter(filepath, name='stream') as writer:
+                writer.append(data[:, 0])
+            _np.testing.assert_array_equal(
+                _hi5.load_dataset(filepath, 'stream'), data[:, 0])
+
+
+    # Check that datasets in many files can be concatenated virtually
+    def test_concat_virtual(self):
+        parts = [_np.random.random((num_rows, 3)) for num_rows in [2, 4, 3]]
+        filepaths = []
+        for idx, part in enumerate(parts):
+            filepaths.append(self.outdir + 'run{:d}.h5'.format(idx))
+            _hi5.save_dataset(filepaths[-1], part, name='group/x')
+        out_path = self.outdir + 'virtual.h5'
+        _hi5.concat_virtual(
+            out_path, self.outdir + 'run*.h5', name='group/x', out_name='x')
+        _np.testing.assert_array_equal(
+            _hi5.load_dataset(out_path, 'x'), _np.concatenate(parts))
+        _np.testing.assert_array_equal(
+            _hi5.load_dataset(out_path, 'x', start_index=3, end_index=7),
+            _np.concatenate(parts)[3:7])
+
+        # Concatenate along columns, with a missing file filled in
+        _hi5.save_dataset(filepaths[1], parts[0], name='group/x')
+        _hi5.concat_virtual(
+            out_path, filepaths[:2] + [self.outdir + 'missing.h5'],
+            name='group/x', axis=1, fill_value=-1.)
+        _np.testing.assert_array_equal(
+            _hi5.load_dataset(out_path, 'group/x'),
+            _np.hstack((parts[0], parts[0], -_np.ones((2, 3)))))
+
+        # Incompatible shapes and missing files without fill values fail
+        with self.assertRaises(ValueError):
+            _hi5.concat_virtual(out_path, filepaths, name='group/x', axis=1)
+        with self.assertRaises(IOError):
+            _hi5.concat_virtual(
+                out_path, [self.outdir + 'missing.h5'], name='group/x')
+        _hi5.save_dataset(filepaths[2], 1., name='group/x')
+        with self.assertRaises(ValueError):
+            _hi5.concat_virtual(out_path, filepaths[2:], name='group/x')
+
+        # Relative paths given from one working directory can be read from
+        # another
+        _os.mkdir(self.outdir + 'sub')
+        curr_dir = _os.getcwd()
+        try:
+            _os.chdir(self.outdir)
+            _hi5.concat_virtual(
+                'sub/virtual.h5', ['run0.h5', 'run1.h5'], name='group/x')
+            _os.chdir(self.outdir + 'sub')
+            _np.testing.assert_array_equal(
+                _hi5.load_dataset('virtual.h5', 'group/x'),
+                _np.concatenate((parts[0], parts[0])))
+        finally:
+            _os.chdir(curr_dir)
+
+
+    # Check that syncing copies only what differs between files
+    def test_sync(self):
+        src_path = self.outdir + 'src.h5'
+        dst_path = self.outdir + 'dst.h5'
+        big = _np.arange(100.)
+        with _h5py.File(src_path, 'w') as fid:
+            fid.create_dataset(
+                'group/big', data=big, chunks=(10,), compression='gzip')
+            fid['group/small'] = _np.arange(3)
+            fid['other'] = 'other'
+            fid['group'].attrs['attr'] = 1
+
+        # Dry run on a missing file changes nothing
+        actions = _hi5.sync(src_path, dst_path, dry_run=True, return_info=True)
+        self.assertEqual(
+            sorted(actions), [('copy', '/group'), ('copy', '/other')])
+        self.assertFalse(_os.path.exists(dst_path))
+
+        # Sync into a new file, then sync again, which should do nothing
+        _hi5.sync(src_path, dst_path)
+        self.assertEqual(_hi5.sync(src_path, dst_path, return_info=True), [])
+
+        # Change the source
+        big[25] = -1
+        with _h5py.File(src_path, 'a') as fid:
+            fid['group/big'][25] = -1
+            fid['group/small'][0] = 5
+            fid['group'].attrs['attr'] = 2
+            fid['new'] = _np.ones(2)
+            del fid['other']
+        with _h5py.File(dst_path, 'a') as fid:
+            fid['extra'] = 1
+        actions = _hi5.sync(src_path, dst_path, return_info=True)
+        self.assertEqual(sorted(actions), [
+            ('attributes', '/group'), ('chunks', '/group/big', 1),
+            ('copy', '/new'), ('data', '/group/small'), ('delete', '/extra'),
+            ('delete', '/other')])
+        with _h5py.File(dst_path, 'r') as fid:
+            self.assertEqual(sorted(fid), ['_high5py_sync', 'group', 'new'])
+            _np.testing.assert_array_equal(fid['group/big'][()], big)
+            _np.testing.assert_array_equal(fid['group/small'][()], [5, 1, 2])
+            self.assertEqual(fid['group'].attrs['attr'], 2)
+            self.assertEqual(fid['group/big'].compression, 'gzip')
+
+        # Once checksums are cached, changes made directly to the destination
+        # are only found when verifying
+        with _h5py.File(dst_path, 'a') as fid:
+            fid['group/big'][0] = -5
+            fid['group/small'][0] = -5
+        self.assertEqual(_hi5.sync(src_path, dst_path, return_info=True), [])
+        self.assertEqual(
+            sorted(_hi5.sync(
+                src_path, dst_path, verify=True, return_info=True)),
+            [('chunks', '/group/big', 1), ('data', '/group/small')])
+        _np.testing.assert_array_equal(
+            _hi5.load_dataset(dst_path, 'group/big'), big)
+        _np.testing.assert_array_equal(
+            _hi5.load_dataset(dst_path, 'group/small'), [5, 1, 2])
+
+        # Changing storage options triggers a full copy of just that dataset
+        _hi5.replace_dataset(src_path, big, name='group/big')
+        self.assertEqual(
+            _hi5.sync(src_path, dst_path, name='group', return_info=True),
+            [('copy', '/group/big')])
+
+        # Hard links (e.g., from dedupe) are kept, along with dedupe savings
+        _hi5.append_dataset(src_path, big, name='d0', dedupe=True)
+        _hi5.append_dataset(src_path, big, name='d1', dedupe=True)
+        _hi5.sync(src_path, dst_path)
+        with _h5py.File(dst_path, 'r') as fid:
+            self.assertEqual(fid['d0'].id, fid['d1'].id)
+        self.assertEqual(
+            _hi5.dedupe_report(dst_path, return_info=True),
+            _hi5.dedupe_report(src_path, return_info=True))
+
+
     # Check that attributes can be loaded correctly
     def test_load_attributes(self):
         name = 'data'
@@ -258,6 +613,171 @@ class TestHigh5Py(_unittest.TestCase):
             self.assertTrue('old_attr' in fid[name].attrs)
 
 
+    # Check that ragged arrays and strings can be saved and loaded
+    def test_save_load_ragged(self):
+        arrays = [_np.random.random((num_rows, 2)) for num_rows in
+            [3, 0, 1, 5, 2]]
+        strings = ['alpha', '', 'b', 'gamma delta', u'\u00e9t\u00e9']
+        for data, compression_level in [(arrays, None), (strings, 4)]:
+            _hi5.save_ragged(
+                self.filepath, data, name='group/ragged', description='desc',
+                compression_level=compression_level)
+            with _h5py.File(self.filepath, 'r') as fid:
+                self.assertEqual(
+                    fid['group/ragged'].attrs['Description'], 'desc')
+            for true_val, val in zip(
+                    data, _hi5.load_ragged(self.filepath, 'group/ragged')):
+                _np.testing.assert_array_equal(val, true_val)
+            for idx in [0, 1, 3, -1]:
+                _np.testing.assert_array_equal(
+                    _hi5.load_ragged(self.filepath, 'group/ragged', index=idx),
+                    data[idx])
+            index = [3, 0, 3, 4, 2]
+            loaded = _hi5.load_ragged(
+                self.filepath, 'group/ragged', index=index)
+            self.assertEqual(len(loaded), len(index))
+            for idx, val in zip(index, loaded):
+                _np.testing.assert_array_equal(val, data[idx])
+            loaded = _hi5.load_ragged(
+                self.filepath, 'group/ragged', start_index=1, end_index=4)
+            self.assertEqual(len(loaded), 3)
+            for true_val, val in zip(data[1:4], loaded):
+                _np.testing.assert_array_equal(val, true_val)
+            self.assertEqual(_hi5.load_ragged(
+                self.filepath, 'group/ragged', start_index=2, end_index=2), [])
+            with self.assertRaises(IndexError):
+                _hi5.load_ragged(self.filepath, 'group/ragged', index=5)
+
+
+    # Check that HDF5 files can be built and queried entirely in memory
+    def test_in_memory(self):
+        buffer = _hi5.dumps(
+            self.float_array, name='group/x', description='desc',
+            compression_level=4)
+        self.assertTrue(isinstance(buffer, bytes))
+        fileobj = _hi5.loads(buffer)
+        _np.testing.assert_array_equal(
+            _hi5.load_dataset(fileobj, 'group/x'), self.float_array)
+        self.assertEqual(
+            _hi5.load_attributes(fileobj, 'group/x'), {'Description': 'desc'})
+
+        # Modify the in-memory file in place, then overwrite it
+        _hi5.append_dataset(fileobj, self.int_vector, name='y')
+        _hi5.rename(fileobj, 'y', 'group/y')
+        self.assertTrue(_hi5.exists(fileobj, 'group/y'))
+        _hi5.delete(fileobj, 'group/x')
+        self.assertEqual(
+            _hi5.info(fileobj, 'group', return_info=True)['datasets'], ['y'])
+        _hi5.save_dataset(fileobj, self.complex_scalar, name='z')
+        self.assertFalse(_hi5.exists(fileobj, 'group'))
+        self._helper_assert_equal(
+            _hi5.load_dataset(_hi5.loads(fileobj.getvalue()), 'z'),
+            self.complex_scalar)
+
+        # Dicts are saved as trees
+        tree = _hi5.load_tree(_hi5.loads(_hi5.dumps({'a': {'b': [1, 2]}})))
+        _np.testing.assert_array_equal(tree['a']['b'], [1, 2])
+
+
+    # Check that sparse matrices can be saved, loaded in blocks, and multiplied
+    # without loading them entirely
+    def test_sparse(self):
+        try:
+            import scipy.sparse as _sparse
+        except ImportError:
+            self.skipTest('scipy is not installed')
+        dense = _np.random.random((23, 17))
+        dense[dense < 0.7] = 0
+        vector = _np.random.random(17)
+        vectors = _np.random.random((17, 2))
+        for fmt in ['csr', 'csc', 'coo', 'lil']:
+            matrix = _sparse.csr_matrix(dense).asformat(fmt)
+            _hi5.save_sparse(
+                self.filepath, matrix, name='group/matrix', description='desc',
+                compression_level=4)
+            loaded = _hi5.load_sparse(self.filepath, name='group/matrix')
+            self.assertEqual(loaded.format, 'csr' if fmt == 'lil' else fmt)
+            _np.testing.assert_array_equal(loaded.toarray(), dense)
+            block = _hi5.load_sparse(
+                self.filepath, name='group/matrix', start_index=5,
+                end_index=9)
+            if fmt == 'csc':
+                _np.testing.assert_array_equal(block.toarray(), dense[:, 5:9])
+            else:
+                _np.testing.assert_array_equal(block.toarray(), dense[5:9])
+            for vec in [vector, vectors]:
+                _np.testing.assert_allclose(
+                    _hi5.sparse_dot(
+                        self.filepath, vec, name='group/matrix', block_size=4),
+                    dense.dot(vec))
+
+        # COO entries in any order are stored sorted by row, so that blocks of
+        # rows are read as slices
+        matrix = _sparse.csc_matrix(dense).tocoo()
+        _hi5.save_sparse(self.filepath, matrix)
+        with _h5py.File(self.filepath, 'r') as fid:
+            row = fid['data/row'][()]
+            self.assertTrue(_np.all(_np.diff(row) >= 0))
+            _np.testing.assert_array_equal(
+                fid['data/row_offsets'][()],
+                _np.searchsorted(row, _np.arange(24)))
+        _np.testing.assert_array_equal(
+            _hi5.load_sparse(self.filepath).toarray(), dense)
+        _np.testing.assert_array_equal(
+            _hi5.load_sparse(
+                self.filepath, start_index=5, end_index=9).toarray(),
+            dense[5:9])
+
+        # COO matrices saved without row offsets can still be loaded
+        with _h5py.File(self.filepath, 'a') as fid:
+            del fid['data/row_offsets']
+        _np.testing.assert_array_equal(
+            _hi5.load_sparse(
+                self.filepath, start_index=5, end_index=9).toarray(),
+            dense[5:9])
+
+
+    # Check that nested dictionaries can be saved and loaded in one call
+    def test_save_load_tree(self):
+        tree = {
+            'name': 'run0',
+            'dt': 0.1,
+            'grid': {'x': _np.arange(5.), 'y': [1, 2, 3]},
+            'results': {'u': _np.random.random((4, 5)), 'step': {'n': 7}},
+            'tags': ['a', 'bc', 'd\u00e9'],
+            'raw': [b'x', b'yz']}
+        _hi5.save_tree(self.filepath, tree, compression_level=4)
+        with _h5py.File(self.filepath, 'r') as fid:
+            self.assertEqual(fid.attrs['name'], 'run0')
+            self.assertEqual(fid['results/step'].attrs['n'], 7)
+            self.assertEqual(fid['results/u'].compression, 'gzip')
+
+        for lazy in [False, True]:
+            loaded = _hi5.load_tree(self.filepath, lazy=lazy)
+            self.assertEqual(sorted(loaded), sorted(tree))
+            self.assertEqual(loaded['name'], 'run0')
+            self.assertEqual(loaded['dt'], 0.1)
+            self.assertEqual(loaded['results']['step'], {'n': 7})
+            _np.testing.assert_array_equal(
+                loaded['grid']['x'], tree['grid']['x'])
+            _np.testing.assert_array_equal(
+                loaded['grid']['y'], tree['grid']['y'])
+            _np.testing.assert_array_equal(
+                loaded['results']['u'], tree['results']['u'])
+            _np.testing.assert_array_equal(loaded['tags'], tree['tags'])
+            _np.testing.assert_array_equal(loaded['raw'], tree['raw'])
+            self.assertEqual(loaded['tags'][2], 'd\u00e9')
+        self.assertEqual(loaded['results']['u'].shape, (4, 5))
+        _np.testing.assert_array_equal(
+            loaded['results']['u'][1:3], tree['results']['u'][1:3])
+
+        # Append a subtree to an existing file
+        _hi5.save_tree(
+            self.filepath, {'z': _np.ones(2)}, name='grid', overwrite=False)
+        loaded = _hi5.load_tree(self.filepath, name='grid')
+        self.assertEqual(sorted(loaded), ['x', 'y', 'z'])
+
+
     # Check that HDF5 files can be correctly converted to NPZ files
     def test_to_npz(self):
 
@@ -342,6 +862,191 @@ class TestHigh5Py(_unittest.TestCase):
                 _np.testing.assert_array_equal(fid[key][()], val)
 
 
+    # Check that HDF5 files can be converted to and from NPY directories
+    def test_to_from_npy_dir(self):
+        npy_dir = _os.path.join(self.outdir, 'npy')
+        with _h5py.File(self.filepath, 'a') as fid:
+            fid['string'] = 'data_string'
+            fid.create_dataset(
+                'strings', data=['a', 'bcd', '', 'ef'],
+                dtype=_h5py.string_dtype())
+            fid.create_group('empty')
+            fid.attrs['root_attr'] = 'root'
+            fid['int'].attrs['int_attr'] = 3
+            fid['float/array'].attrs['array_attr'] = _np.arange(3.)
+            fid['complex/vector'].attrs['complex_attr'] = 1 + 2j
+        for num_workers in [None, 2]:
+            _shutil.rmtree(npy_dir, ignore_errors=True)
+            _hi5.to_npy_dir(
+                self.filepath, npy_dir, max_block_bytes=16,
+                num_workers=num_workers)
+            for dset_name, var_name in zip(self.dset_names, self.var_names):
+                _np.testing.assert_array_equal(
+                    _np.load(_os.path.join(npy_dir, dset_name + '.npy')),
+                    getattr(self, var_name))
+            _np.testing.assert_array_equal(
+                _np.load(_os.path.join(npy_dir, 'strings.npy')),
+                ['a', 'bcd', '', 'ef'])
+
+            # Convert back, with and without the manifest
+            h5_path = self.outdir + 'from_npy.h5'
+            _hi5.from_npy_dir(npy_dir, h5_path, max_block_bytes=16)
+            with _h5py.File(h5_path, 'r') as fid:
+                for dset_name, var_name in zip(
+                        self.dset_names, self.var_names):
+                    self._helper_assert_equal(
+                        fid[dset_name][()], getattr(self, var_name))
+                self.assertEqual(fid['string'][()], b'data_string')
+                self.assertEqual(
+                    list(fid['strings'].asstr()[()]), ['a', 'bcd', '', 'ef'])
+                self.assertTrue('empty' in fid)
+                self.assertEqual(fid.attrs['root_attr'], 'root')
+                self.assertEqual(fid['int'].attrs['int_attr'], 3)
+                _np.testing.assert_array_equal(
+                    fid['float/array'].attrs['array_attr'], _np.arange(3.))
+                self.assertEqual(
+                    fid['complex/vector'].attrs['complex_attr'], 1 + 2j)
+        _os.remove(_os.path.join(npy_dir, 'manifest.json'))
+        _hi5.from_npy_dir(npy_dir, h5_path, name='group')
+        with _h5py.File(h5_path, 'r') as fid:
+            _np.testing.assert_array_equal(
+                fid['group/float/array'][()], self.float_array)
+
+        # Convert a single group
+        _shutil.rmtree(npy_dir)
+        _hi5.to_npy_dir(self.filepath, npy_dir, name='int')
+        self.assertEqual(
+            sorted(_os.listdir(npy_dir)),
+            ['array.npy', 'manifest.json', 'scalar.npy', 'vector.npy'])
+
+        # Convert a single dataset in a worker process
+        _shutil.rmtree(npy_dir)
+        _hi5.to_npy_dir(self.filepath, npy_dir, name='int/vector', num_workers=1)
+        _np.testing.assert_array_equal(
+            _np.load(_os.path.join(npy_dir, 'vector.npy')), self.int_vector)
+
+        # Every name of a hard-linked dataset is saved, while the dedupe index
+        # and private attributes are not
+        _shutil.rmtree(npy_dir)
+        _hi5.save_dataset(self.filepath, _np.arange(5), name='a', dedupe=True)
+        _hi5.append_dataset(
+            self.filepath, _np.arange(5), name='group/b', dedupe=True)
+        with _h5py.File(self.filepath, 'a') as fid:
+            fid['a'].attrs['_high5py_note'] = 1
+        _hi5.to_npy_dir(self.filepath, npy_dir)
+        self.assertEqual(
+            sorted(_os.listdir(npy_dir)), ['a.npy', 'group', 'manifest.json'])
+        _np.testing.assert_array_equal(
+            _np.load(_os.path.join(npy_dir, 'group', 'b.npy')), _np.arange(5))
+        with open(_os.path.join(npy_dir, 'manifest.json')) as manifest_file:
+            manifest = _json.load(manifest_file)
+        self.assertEqual(sorted(manifest['datasets']), ['a', 'group/b'])
+        self.assertEqual(manifest['attributes'], {'/': {}})
+
+
+    # Check that zone maps let queries skip zones, and are kept up to date
+    def test_zone_map(self):
+        times = _np.arange(1000.)
+        table = _np.column_stack((times, _np.random.random(1000)))
+        with _h5py.File(self.filepath, 'w') as fid:
+            fid.create_dataset('group/table', data=table, chunks=(100, 2))
+            fid.create_dataset('vector', data=times[::-1].copy())
+            fid.create_dataset('columns', data=table.T.copy())
+        _hi5.build_zone_map(self.filepath, 'group/table')
+        _hi5.build_zone_map(self.filepath, 'vector', zone_size=64)
+        _hi5.build_zone_map(self.filepath, 'columns', axis=1, zone_size=50)
+        with _h5py.File(self.filepath, 'r') as fid:
+            zone_map = fid['_high5py_zone_maps/%2Fgroup%2Ftable']
+            self.assertEqual(zone_map['min'].shape, (10, 2))
+            _np.testing.assert_array_equal(
+                zone_map['min'][:, 0], _np.arange(0., 1000., 100.))
+        for low, high in [(250, 420.5), (None, 5), (990, None), (2000, None)]:
+            mask = _np.ones(1000, dtype=bool)
+            if low is not None:
+                mask &= times >= low
+            if high is not None:
+                mask &= times <= high
+            _np.testing.assert_array_equal(
+                _hi5.query_dataset(
+                    self.filepath, 'group/table', where=(low, high), column=0),
+                table[mask])
+            _np.testing.assert_array_equal(
+                _hi5.query_dataset(
+                    self.filepath, 'vector', where=(low, high)),
+                times[::-1][mask[::-1]])
+            _np.testing.assert_array_equal(
+                _hi5.query_dataset(
+                    self.filepath, 'columns', where=(low, high), column=0),
+                table.T[:, mask])
+        with self.assertRaises(ValueError):
+            _hi5.query_dataset(self.filepath, 'group/table', where=(0, 1))
+
+        # Zone maps follow renames, deletes, and replacements
+        _hi5.rename(self.filepath, 'group/table', 'group/moved')
+        self.assertTrue(
+            _hi5.exists(self.filepath, '_high5py_zone_maps/%2Fgroup%2Fmoved'))
+        _hi5.replace_dataset(self.filepath, times + 1000, name='vector')
+        _np.testing.assert_array_equal(
+            _hi5.query_dataset(self.filepath, 'vector', where=(1998, None)),
+            [1998., 1999.])
+        with _h5py.File(self.filepath, 'r') as fid:
+            zone_map = fid['_high5py_zone_maps/%2Fvector']
+            self.assertEqual(zone_map.attrs['zone_size'], 64)
+            self.assertEqual(zone_map['min'][0, 0], 1000)
+        _hi5.replace_dataset(self.filepath, 'text', name='vector')
+        self.assertEqual(_hi5.load_dataset(self.filepath, 'vector'), b'text')
+        self.assertFalse(
+            _hi5.exists(self.filepath, '_high5py_zone_maps/%2Fvector'))
+        _hi5.delete(self.filepath, 'vector')
+        self.assertFalse(_hi5.exists(self.filepath, 'vector'))
+
+        # Zone maps are hidden, move with their groups, and never clash with
+        # user data
+        _hi5.append_dataset(self.filepath, 1, name='columns_zone_map')
+        self.assertEqual(
+            _hi5.info(self.filepath, return_info=True)['groups'], ['group'])
+        self.assertNotIn('_high5py_zone_maps', _hi5.load_tree(self.filepath))
+        _hi5.rename(self.filepath, 'group', 'renamed')
+        _np.testing.assert_array_equal(
+            _hi5.query_dataset(
+                self.filepath, 'renamed/moved', where=(5, 6), column=0),
+            table[5:7])
+        _hi5.delete(self.filepath, 'columns')
+        _hi5.delete(self.filepath, 'renamed')
+        self.assertEqual(
+            _hi5.load_dataset(self.filepath, 'columns_zone_map'), 1)
+        with _h5py.File(self.filepath, 'r') as fid:
+            self.assertEqual(len(fid['_high5py_zone_maps']), 0)
+
+        # Zone maps are updated as rows are appended in SWMR mode, and rows
+        # appended by other means are still found
+        filepath = self.outdir + 'stream.h5'
+        with _hi5.SWMRWriter(filepath, name='t', chunk_rows=10) as writer:
+            writer.append(times[:15])
+        _hi5.build_zone_map(filepath, 't')
+        with _hi5.SWMRWriter(filepath, name='t') as writer:
+            writer.append(times[15:40])
+        with _h5py.File(filepath, 'r') as fid:
+            self.assertEqual(fid['_high5py_zone_maps/%2Ft/max'][-1, 0], 39)
+        with _h5py.File(filepath, 'a') as fid:
+            fid['t'].resize((50,))
+            fid['t'][40:] = times[40:50]
+        _np.testing.assert_array_equal(
+            _hi5.query_dataset(filepath, 't', where=(38, 45)), times[38:46])
+
+        # Zone maps along the second axis are dropped when appending rows
+        with _hi5.SWMRWriter(
+                filepath, name='rows', row_shape=(2,), chunk_rows=10) as writer:
+            writer.append(table[:20])
+        _hi5.build_zone_map(filepath, 'rows', axis=1, zone_size=1)
+        with _hi5.SWMRWriter(filepath, name='rows') as writer:
+            writer.append(table[20:30])
+        self.assertFalse(_hi5.exists(filepath, '_high5py_zone_maps/%2Frows'))
+        _np.testing.assert_array_equal(
+            _hi5.query_dataset(filepath, 'rows', where=(25, 28), column=0),
+            table[25:29])
+
+
 # Main routine
 if __name__=='__main__':
     _unittest.main(verbosity=2)
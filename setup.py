@@ -25,5 +25,6 @@ setup(
         'Programming Language :: Python :: 3'
     ],
     packages=[pkg_name],
-    install_requires=['h5py', 'numpy']
+    install_requires=['h5py', 'numpy'],
+    extras_require={'sparse': ['scipy']}
 )